@@ -0,0 +1,75 @@
+"""
+Time generate_challans_batch() with the thread pool and the process pool and
+check that both produce the same workbooks.
+
+Run from the repository root:
+
+    python benchmarks/bench_batch.py [number_of_challans] [workers]
+
+The generated files go to a temporary directory. Workbooks are compared part by
+part, leaving out docProps/core.xml, which holds the save timestamp.
+"""
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import challan_ledger
+import challan_timing
+import Transport_Challan
+from Transport_Challan import generate_challans_batch
+
+COMPANY_DATA = {"ABC TEXTILES": {"address1": "RING ROAD", "address2": "SURAT", "gst": "24ABCDE1234F1Z5"}}
+TRANSPORT_DATA = {"XYZ FABRICS": {"station": "DELHI", "gst": "07ABCDE1234F1Z5", "Way": "ROAD"}}
+
+
+def make_specs(count):
+    return [
+        {
+            "company_name": "ABC TEXTILES", "transport_name": "XYZ FABRICS", "contact_no": "9876543210",
+            "date": f"{i % 28 + 1:02d}.12.25", "challan_number": str(i + 1), "discount": 10, "gst": 5,
+            "items": [("saree", "5407", 3 + i % 5, 1500), ("dress", "5208", 2, 800)],
+        }
+        for i in range(count)
+    ]
+
+
+def package_parts(path):
+    with zipfile.ZipFile(path) as archive:
+        return {name: archive.read(name) for name in archive.namelist() if name != "docProps/core.xml"}
+
+
+def run(specs, workers, processes, directory):
+    Transport_Challan.COUNTER_FILE = os.path.join(directory, "file_counter.json")
+    challan_ledger.LEDGER_FILE = os.path.join(directory, "challan_ledger.db")
+    challan_timing.TIMING_LOG_FILE = os.path.join(directory, "challan_timing.jsonl")
+    Transport_Challan.item_catalog.file_path = os.path.join(directory, "item_catalog.json")
+    start = time.perf_counter()
+    report = generate_challans_batch(specs, COMPANY_DATA, TRANSPORT_DATA, workers=workers, directory=directory, processes=processes)
+    elapsed = time.perf_counter() - start
+    assert all(entry["ok"] for entry in report), report
+    return elapsed, report
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    specs = make_specs(count)
+    with tempfile.TemporaryDirectory() as threads_dir, tempfile.TemporaryDirectory() as processes_dir:
+        thread_time, thread_report = run(specs, workers, False, threads_dir)
+        process_time, process_report = run(specs, workers, True, processes_dir)
+        same = all(
+            package_parts(a["file"]) == package_parts(b["file"]) and a["counter"] == b["counter"]
+            for a, b in zip(thread_report, process_report)
+        )
+    print(f"{count} challans, {workers} workers")
+    print(f"thread pool  : {thread_time:7.2f} s ({thread_time / count * 1000:6.2f} ms/challan)")
+    print(f"process pool : {process_time:7.2f} s ({process_time / count * 1000:6.2f} ms/challan)")
+    print(f"identical output: {same}")
+
+
+if __name__ == "__main__":
+    main()
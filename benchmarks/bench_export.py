@@ -0,0 +1,88 @@
+"""
+Time exporting a day's challans as the sheets of one workbook against
+writing one workbook per challan, and check the sheets match the files.
+
+Run from the repository root:
+
+    python benchmarks/bench_export.py [number_of_challans]
+
+Builds `number_of_challans` synthetic challans (every tenth one with 20
+items, so it runs over three pages) and times three ways of producing them:
+one .xlsx per challan, export_challans_workbook() straight from the challan
+values, and export_day_workbook() from the ledger, which reads the saved
+files back. Exits with status 1 if a sheet's values differ from its file.
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import challan_ledger
+import challan_timing
+import Transport_Challan
+from openpyxl import load_workbook
+
+COMPANY_DATA = {"ABC TEXTILES": {"address1": "RING ROAD", "address2": "SURAT", "gst": "24ABCDE1234F1Z5"}}
+TRANSPORT_DATA = {"XYZ FABRICS": {"station": "DELHI", "gst": "07ABCDE1234F1Z5", "Way": "ROAD"}}
+
+
+def challan_arguments(count):
+    for n in range(count):
+        item_count = 20 if n % 10 == 0 else 5
+        items = [(f"item {i}", "5407", 1 + i % 9, 100 + 10 * i) for i in range(item_count)]
+        yield ("9876543210", "ABC TEXTILES", "XYZ FABRICS", items, 10, 5, "12.12.25", str(n + 1), "1", "2")
+
+
+def sheet_values(ws):
+    return {(cell.row, cell.column): cell.value for row in ws.iter_rows() for cell in row if cell.value is not None}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    arguments = list(challan_arguments(count))
+    with tempfile.TemporaryDirectory() as directory:
+        Transport_Challan.COUNTER_FILE = os.path.join(directory, "file_counter.json")
+        challan_ledger.LEDGER_FILE = os.path.join(directory, "challan_ledger.db")
+        challan_timing.TIMING_LOG_FILE = os.path.join(directory, "challan_timing.jsonl")
+        Transport_Challan.item_catalog.file_path = os.path.join(directory, "item_catalog.json")
+        Transport_Challan.get_challan_template()
+
+        start = time.perf_counter()
+        files = os.path.join(directory, "files")
+        os.makedirs(files)
+        report = Transport_Challan.generate_challans_batch(
+            [dict(zip(["contact_no", "company_name", "transport_name", "items", "discount", "gst", "date", "challan_number", "No_of_Other_Party_Goods", "Amount_of_Other_Party_Goods"], args)) for args in arguments],
+            COMPANY_DATA, TRANSPORT_DATA, workers=1, directory=files, storage="files",
+        )
+        separate = time.perf_counter() - start
+        print(f"one file per challan : {separate:6.2f} s for {count} files")
+
+        start = time.perf_counter()
+        rendered = os.path.join(directory, "rendered.xlsx")
+        Transport_Challan.export_challans_workbook(
+            ((args[7], Transport_Challan.challan_page_values(COMPANY_DATA, TRANSPORT_DATA, *args)) for args in arguments), rendered,
+        )
+        print(f"one workbook         : {time.perf_counter() - start:6.2f} s for {count} sheets")
+
+        start = time.perf_counter()
+        day = os.path.join(directory, "day.xlsx")
+        with contextlib.redirect_stdout(io.StringIO()):
+            Transport_Challan.export_day_workbook("12.12.25", day)
+        print(f"day from the ledger  : {time.perf_counter() - start:6.2f} s (reads the {count} files back)")
+
+        same = True
+        for path in (rendered, day):
+            workbook = load_workbook(path)
+            same = same and len(workbook.worksheets) == count
+            for entry, ws in zip(report, workbook.worksheets):
+                same = same and sheet_values(ws) == sheet_values(load_workbook(entry["file"]).active)
+    print(f"sheets match the files: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Time format_ws() on its own and report the size of the styles.xml it leaves in
+a saved workbook.
+
+Run from the repository root:
+
+    python benchmarks/bench_format_ws.py [number_of_layouts]
+"""
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+
+from Transport_Challan import format_ws
+
+
+def time_per_layout(count):
+    workbooks = [Workbook() for _ in range(count)]  # keep Workbook() out of the timing
+    start = time.perf_counter()
+    for wb in workbooks:
+        format_ws(wb.active)
+    return (time.perf_counter() - start) / count * 1000
+
+
+def styles_xml():
+    wb = Workbook()
+    format_ws(wb.active)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    with zipfile.ZipFile(buffer) as archive:
+        return archive.read("xl/styles.xml").decode()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    time_per_layout(10)  # warm up imports and caches
+    layout_ms = min(time_per_layout(count) for _ in range(3))
+    styles = styles_xml()
+    tables = {tag: re.search(rf'<{tag} count="(\d+)"', styles) for tag in ("fonts", "borders", "cellXfs", "cellStyles")}
+    print(f"format_ws    : {layout_ms:6.2f} ms/layout ({count} layouts, best of 3)")
+    print(f"styles.xml   : {len(styles)} bytes")
+    print("style tables : " + ", ".join(f"{tag} {match.group(1) if match else 0}" for tag, match in tables.items()))
+
+
+if __name__ == "__main__":
+    main()
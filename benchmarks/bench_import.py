@@ -0,0 +1,92 @@
+"""
+Time the parallel challan importer on a directory of synthetic challan
+workbooks and check that an interrupted import resumes to the same output.
+
+Run from the repository root:
+
+    python benchmarks/bench_import.py [number_of_files] [workers]
+
+Writes one single-page and one multi-page challan, copies them into
+`number_of_files` files in a temporary directory and imports them with one
+process and with `workers` processes. Then it cuts the output off in the middle
+of a line and imports again. Exits with status 1 if the outputs differ.
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import challan_ledger
+import challan_timing
+import Transport_Challan
+from challan_import import import_challans
+
+COMPANY_DATA = {"ABC TEXTILES": {"address1": "RING ROAD", "address2": "SURAT", "gst": "24ABCDE1234F1Z5"}}
+TRANSPORT_DATA = {"XYZ FABRICS": {"station": "DELHI", "gst": "07ABCDE1234F1Z5", "Way": "ROAD"}}
+
+
+def make_files(directory, count):
+    source = os.path.join(directory, "source")
+    Transport_Challan.COUNTER_FILE = os.path.join(directory, "file_counter.json")
+    Transport_Challan.CHALLAN_DIRECTORY = source
+    Transport_Challan.CHALLAN_VIEWER = "none"
+    challan_ledger.LEDGER_FILE = os.path.join(directory, "challan_ledger.db")
+    challan_timing.TIMING_LOG_FILE = os.path.join(directory, "challan_timing.jsonl")
+    Transport_Challan.item_catalog.file_path = os.path.join(directory, "item_catalog.json")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for item_count in (5, 20):
+            items = [(f"item {i}", "5407", 1 + i % 9, 100 + 10 * i) for i in range(item_count)]
+            Transport_Challan.generate_challan(COMPANY_DATA, TRANSPORT_DATA, "9876543210", "ABC TEXTILES", "XYZ FABRICS", items, 10, 5, "12.12.25", "1", "2", "300")
+    sources = [os.path.join(source, file) for file in sorted(os.listdir(source))]
+
+    files = os.path.join(directory, "challans")
+    os.makedirs(files)
+    for i in range(count):
+        shutil.copy(sources[i % 2], os.path.join(files, f"transport_challan_ABC_TEXTILES_XYZ_FABRICS_12_12_25_{i + 1}.xlsx"))
+    return files
+
+
+def run(files, output, workers):
+    start = time.perf_counter()
+    imported, failed, skipped = import_challans(files, output, workers)
+    return imported, failed, skipped, time.perf_counter() - start
+
+
+def read_lines(path):
+    with open(path, "r") as file:
+        return sorted(file.read().splitlines())
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 4
+    with tempfile.TemporaryDirectory() as directory:
+        files = make_files(directory, count)
+        results = {}
+        for run_number, (label, process_count) in enumerate((("1 process", 1), (f"{workers} processes", workers))):
+            # A fresh output per run, or the second run would resume from the first when workers is 1
+            output = os.path.join(directory, f"run{run_number}.jsonl")
+            imported, failed, _, elapsed = run(files, output, process_count)
+            results[label] = read_lines(output)
+            print(f"{label:12}: {imported} imported, {failed} failed in {elapsed:.2f} s ({imported / elapsed:.0f} files/s)")
+
+        # Interrupt: keep the first half of the last run's output, ending in a partial line
+        with open(output, "rb") as file:
+            data = file.read()
+        with open(output, "wb") as file:
+            file.write(data[:len(data) // 2])
+        imported, failed, skipped, elapsed = run(files, output, workers)
+        print(f"resume      : {imported} imported, {skipped} already done in {elapsed:.2f} s")
+
+        same = results["1 process"] == results[f"{workers} processes"] == read_lines(output)
+    print(f"identical output: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Time type-ahead searches and incremental adds on the supplier/customer name
+index with a large synthetic name list.
+
+Run from the repository root:
+
+    python benchmarks/bench_name_index.py [number_of_names]
+
+Prints the per-query latency for prefix, word and multi-word queries, and the
+worst one, which should stay under a millisecond.
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from name_index import NameIndex
+
+QUERIES = ["A", "AB", "SHR", "TEX", "KUMAR TEX", "TEX SH", "A B", "A B C D", "QZXJ", "S K T"]
+
+
+def make_names(count, rng):
+    words = ["".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 9))) for _ in range(count // 3)]
+    words += ["TEXTILES", "FABRICS", "KUMAR", "SHREE", "TRADERS", "SAREES"]
+    names = set()
+    while len(names) < count:
+        names.add(" ".join(rng.choice(words) for _ in range(rng.randint(1, 4))))
+    return sorted(names)
+
+
+def per_call_us(function, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(1)
+    names = make_names(count, rng)
+
+    start = time.perf_counter()
+    index = NameIndex(names)
+    print(f"{len(index)} names, index built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    worst = 0.0
+    for query in QUERIES:
+        us = per_call_us(lambda: index.search(query))
+        worst = max(worst, us)
+        print(f"search {query!r:14}: {us:7.1f} us, {len(index.search(query))} matches")
+
+    new_names = [f"NEW PARTY {i}" for i in range(1000)]
+    start = time.perf_counter()
+    for name in new_names:
+        index.add(name)
+    print(f"add            : {(time.perf_counter() - start) / len(new_names) * 1e6:7.1f} us/name")
+    print(f"slowest search : {worst:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
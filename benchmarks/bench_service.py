@@ -0,0 +1,112 @@
+"""
+Drive the challan HTTP service on localhost and report its throughput and
+latency.
+
+Run from the repository root:
+
+    python benchmarks/bench_service.py [number_of_challans] [connections] [workers]
+
+The service is started in this process on a free port. The counter, ledger,
+master data and challans all go to a temporary directory. The script adds the
+master data over the API and checks an error response and a workbook
+download. Then it sends the challans over `connections` keep-alive
+connections. Exits with status 1 if any request fails.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import challan_ledger
+import challan_timing
+import Transport_Challan
+from challan_service import ChallanService
+
+SPEC = {
+    "company_name": "ABC TEXTILES", "transport_name": "XYZ FABRICS", "contact_no": "9876543210",
+    "date": "12.12.25", "challan_number": "1", "discount": 10, "gst": 5,
+    "items": [["saree", "5407", 3, 1500], ["dress", "5208", 2, 800]],
+}
+
+
+async def request(reader, writer, method, path, body=None):
+    payload = b"" if body is None else json.dumps(body).encode("utf-8")
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, await reader.readexactly(int(headers["content-length"]))
+
+
+async def client(port, count, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    failures = 0
+    for _ in range(count):
+        start = time.perf_counter()
+        status, _ = await request(reader, writer, "POST", "/challans", SPEC)
+        latencies.append(time.perf_counter() - start)
+        failures += status != 201
+    writer.close()
+    return failures
+
+
+async def run(count, connections, workers, directory):
+    service = ChallanService(workers=workers, directory=directory)
+    port = await service.start("127.0.0.1", 0)
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        checks = [
+            await request(reader, writer, "PUT", "/companies/ABC%20TEXTILES", {"address1": "RING ROAD", "address2": "SURAT", "gst": "24ABCDE1234F1Z5"}),
+            await request(reader, writer, "PUT", "/transports/XYZ%20FABRICS", {"station": "DELHI", "gst": "07ABCDE1234F1Z5", "Way": "ROAD"}),
+        ]
+        status, _ = await request(reader, writer, "POST", "/challans", {"company_name": "ABC TEXTILES"})
+        checks.append((200 if status == 400 else status, b""))
+        status, workbook = await request(reader, writer, "POST", "/challans?format=xlsx", SPEC)
+        checks.append((200 if status == 201 and workbook[:2] == b"PK" else status, b""))
+        writer.close()
+        failures = sum(status != 200 for status, _ in checks)
+
+        latencies = []
+        start = time.perf_counter()
+        per_connection = [count // connections + (i < count % connections) for i in range(connections)]
+        failures += sum(await asyncio.gather(*(client(port, n, latencies) for n in per_connection)))
+        elapsed = time.perf_counter() - start
+        metrics = service.metrics()
+    finally:
+        await service.close()
+    return failures, elapsed, sorted(latencies), metrics
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    with tempfile.TemporaryDirectory() as directory:
+        Transport_Challan.COUNTER_FILE = os.path.join(directory, "file_counter.json")
+        challan_ledger.LEDGER_FILE = os.path.join(directory, "challan_ledger.db")
+        challan_timing.TIMING_LOG_FILE = os.path.join(directory, "challan_timing.jsonl")
+        Transport_Challan.item_catalog.file_path = os.path.join(directory, "item_catalog.json")
+        Transport_Challan.company_store.file_path = os.path.join(directory, "company_data.json")
+        Transport_Challan.transport_store.file_path = os.path.join(directory, "transport_data.json")
+        failures, elapsed, latencies, metrics = asyncio.run(run(count, connections, workers, directory))
+
+    print(f"{count} challans over {connections} connections, {workers} workers")
+    print(f"client      : {count / elapsed:7.1f} challans/s, p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms")
+    print(f"/metrics    : {json.dumps(metrics)}")
+    print(f"failures    : {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""
+Benchmark suite for the challan pipeline, with results saved as JSON so runs
+can be compared across commits.
+
+Run from the repository root:
+
+    python benchmarks/run_suite.py [--quick] [--only NAME ...] [--output FILE] [--compare OLD.json]
+
+Cases (all data is synthetic and lives in a temporary directory):
+
+    format_ws                     lay out one empty challan
+    generate_challan[items=N]     counter, workbook, ledger entry; N = 1, 7, 50, 500
+    load_data_file[parties=N]     parse a master-data JSON file; N = 10, 1k, 100k
+    master_data_get[parties=N]    first MasterDataStore.get() from the journal
+    master_data_search[parties=N] one type-ahead search
+    item_catalog_search[items=N]  one item autocomplete, a customer's recent items first; N = 10, 1k, 100k
+    ledger_monthly_counts[rows=N] monthly counts from the ledger
+    analytics_build[items=N]      first Statistics summary, ledger read into columns; N = 1k, 100k, 1M
+    analytics_summary[items=N]    the summary again with the columns saved next to the ledger
+    search_build[items=N]         building the challan search index from the ledger
+    search_query[items=N]         one search on a built index (a mix of field, word and date queries)
+    gui_import                    importing tempcodefile (in a fresh interpreter)
+    gui_startup                   building the main window (skipped without a display)
+
+--quick drops the 100k sizes (1M item lines for analytics) and the 500-item challan. Results go to
+challan_benchmarks/<commit>.json in the system temporary directory unless
+--output is given, so they stay out of the repository; --compare prints the
+change of every case against an earlier result file.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import challan_analytics
+import challan_ledger
+import challan_timing
+import challan_search
+import Transport_Challan
+from openpyxl import Workbook
+
+RESULTS_DIRECTORY = os.path.join(tempfile.gettempdir(), "challan_benchmarks")
+
+
+def measure(function, min_time=0.5, max_runs=200, min_runs=3, setup=None):
+    """
+    Call `function` until `min_time` seconds or `max_runs` calls; timings in
+    milliseconds. `setup` is called untimed before every call.
+    """
+    times = []
+    started = time.perf_counter()
+    while len(times) < min_runs or (len(times) < max_runs and time.perf_counter() - started < min_time):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": len(times),
+        "min_ms": round(min(times), 4),
+        "median_ms": round(statistics.median(times), 4),
+        "mean_ms": round(statistics.fmean(times), 4),
+    }
+
+
+def party_names(count, prefix):
+    rng = random.Random(count)
+    words = ["SHREE", "KUMAR", "TEXTILES", "FABRICS", "SAREES", "TRADERS", "SILK", "CREATIONS", "FASHION", "MILLS"]
+    return [f"{prefix} {' '.join(rng.sample(words, 2))} {i}" for i in range(count)]
+
+
+def master_data(count):
+    return {name: {"address1": "RING ROAD", "address2": "SURAT", "gst": "24ABCDE1234F1Z5"} for name in party_names(count, "PARTY")}
+
+
+def items(count):
+    return [(f"item {i}", "5407", 1 + i % 9, 100 + 10 * i) for i in range(count)]
+
+
+# Cases ---------------------------------------------------------------------
+
+def bench_format_ws(work):
+    workbooks = []
+    return measure(lambda: Transport_Challan.format_ws(workbooks.pop().active), setup=lambda: workbooks.append(Workbook()))
+
+
+def bench_generate_challan(work, count):
+    company_data = {"ABC TEXTILES": {"address1": "RING ROAD", "address2": "SURAT", "gst": "24ABCDE1234F1Z5"}}
+    transport_data = {"XYZ FABRICS": {"station": "DELHI", "gst": "07ABCDE1234F1Z5", "Way": "ROAD"}}
+    item_rows = items(count)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            Transport_Challan.generate_challan(
+                company_data, transport_data, "9876543210", "ABC TEXTILES", "XYZ FABRICS",
+                item_rows, 10, 5, "12.12.25", "1", "2", "300",
+            )
+    Transport_Challan.get_challan_template()
+    return measure(run, max_runs=50 if count > 50 else 200)
+
+
+def bench_load_data_file(work, count):
+    path = os.path.join(work, f"company_data_{count}.json")
+    Transport_Challan.save_data_file(path, master_data(count))
+    return measure(lambda: Transport_Challan.load_data_file(path), max_runs=20 if count > 1000 else 200)
+
+
+def journal_store(work, count):
+    path = os.path.join(work, f"journal_{count}", "company_data.json")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path))
+        Transport_Challan.save_data_file(path, master_data(count))
+        with contextlib.redirect_stdout(io.StringIO()):
+            Transport_Challan.MasterDataStore(path, "journal").get()  # migrate outside the timing
+    return path
+
+
+def bench_master_data_get(work, count):
+    path = journal_store(work, count)
+    return measure(lambda: Transport_Challan.MasterDataStore(path, "journal").get(), max_runs=20 if count > 1000 else 200)
+
+
+def bench_master_data_search(work, count):
+    store = Transport_Challan.MasterDataStore(journal_store(work, count), "journal")
+    store.index()
+    queries = iter(["S", "SH", "SHREE", "KUMAR TEX", "SILK 12", "FAB", "MILLS CREA", "Q"] * 10000)
+    return measure(lambda: store.search(next(queries)))
+
+
+def bench_item_catalog_search(work, count):
+    path = os.path.join(work, f"catalog_{count}", "item_catalog.json")
+    os.makedirs(os.path.dirname(path))
+    catalog = Transport_Challan.ItemCatalog(path, "journal")
+    catalog.get()
+    catalog.update((name, {"name": name.lower(), "hsn": "5407", "amount": 100}) for name in party_names(count, "ITEM"))
+    catalog.save()
+    catalog.index()
+    catalog.recent["XYZ FABRICS"] = Transport_Challan.OrderedDict.fromkeys(party_names(min(count, Transport_Challan.RECENT_ITEMS), "ITEM"))
+    queries = iter(["I", "IT", "ITEM S", "SILK 12", "FAB", "MILLS CREA", "Q"] * 10000)
+    return measure(lambda: catalog.search(next(queries), 8, "XYZ FABRICS"))
+
+
+def bench_ledger_monthly_counts(work, count):
+    path = os.path.join(work, f"ledger_{count}.db")
+    connection = challan_ledger.connect_ledger(path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO challans (counter, challan_number, date, issued_on, company_name, transport_name, file) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(i, str(i), "", f"20{24 + i % 2}-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "ABC", "XYZ", f"file_{i}.xlsx") for i in range(count)],
+        )
+    connection.close()
+    return measure(lambda: challan_ledger.monthly_counts(path=path), max_runs=50)
+
+
+def analytics_ledger(work, count):
+    """Ledger with `count` item lines, seven to a challan, spread over three years."""
+    path = os.path.join(work, f"analytics_{count}.db")
+    if os.path.exists(path):
+        return path
+    challans = max(1, count // 7)
+    connection = challan_ledger.connect_ledger(path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO challans (id, counter, challan_number, date, issued_on, company_name, transport_name, discount, gst, "
+            "total_pieces, total_amount, net_amount, file) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((i, i, str(i), "", f"20{23 + i % 3}-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"SUPPLIER {i % 500}", f"CUSTOMER {i % 3000}",
+              10, 5, 35, 700, 695, f"file_{i}.xlsx") for i in range(1, challans + 1)),
+        )
+        connection.executemany(
+            "INSERT INTO items (challan_id, line_no, item_name, hsn, pieces, amount) VALUES (?, ?, ?, ?, ?, ?)",
+            ((1 + j // 7, j % 7 + 1, "saree", str(5400 + j % 300), 1 + j % 9, 100) for j in range(count)),
+        )
+    connection.close()
+    return path
+
+
+def bench_analytics_build(work, count):
+    path = analytics_ledger(work, count)
+
+    def forget():
+        challan_analytics._columns.clear()
+        if os.path.exists(challan_analytics.columns_file(path)):
+            os.remove(challan_analytics.columns_file(path))
+    return measure(lambda: challan_analytics.challan_summary(path), max_runs=3 if count > 100000 else 20, setup=forget)
+
+
+def bench_analytics_summary(work, count):
+    path = analytics_ledger(work, count)
+    challan_analytics.challan_summary(path)
+    return measure(lambda: challan_analytics.challan_summary(path), setup=challan_analytics._columns.clear)
+
+
+def bench_search_build(work, count):
+    path = analytics_ledger(work, count)
+    return measure(lambda: challan_search.load_search_index(path), max_runs=3 if count > 100000 else 20, setup=challan_search._indexes.clear)
+
+
+def bench_search_query(work, count):
+    index = challan_search.load_search_index(analytics_ledger(work, count))
+    queries = iter([
+        'customer:"CUSTOMER 12" hsn:5407', "hsn:5407 from:01.07.25 to:30.09.25", "SUPPLIER 49", "saree",
+        "no:1234", "date:2024-06", "1", "supplier:supp hsn:54 date:2023",
+    ] * 10000)
+    challan_search._indexes.clear()
+    return measure(lambda: index.search(next(queries)))
+
+
+GUI_IMPORT = "import time; start = time.perf_counter(); import tempcodefile; print(time.perf_counter() - start)"
+
+GUI_STARTUP = """
+import time
+start = time.perf_counter()
+import tempcodefile
+app = tempcodefile.MainApp()
+app.update()
+print(time.perf_counter() - start)
+app.destroy()
+"""
+
+
+def run_python(code, work):
+    env = dict(os.environ, MASTER_DATA_BACKEND="journal")
+    result = subprocess.run([sys.executable, "-c", code], cwd=work, env=dict(env, PYTHONPATH=ROOT), capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        return None, (result.stderr.strip().splitlines() or ["failed"])[-1]
+    return float(result.stdout.strip().splitlines()[-1]) * 1000, None
+
+
+def bench_subprocess(work, code, runs=3):
+    times = []
+    for _ in range(runs):
+        elapsed, error = run_python(code, work)
+        if error:
+            return {"skipped": error}
+        times.append(elapsed)
+    return {"runs": runs, "min_ms": round(min(times), 2), "median_ms": round(statistics.median(times), 2), "mean_ms": round(statistics.fmean(times), 2)}
+
+
+def cases(quick):
+    sizes = [10, 1000] if quick else [10, 1000, 100000]
+    item_counts = [1, 7, 50] if quick else [1, 7, 50, 500]
+    yield "format_ws", bench_format_ws, ()
+    for count in item_counts:
+        yield f"generate_challan[items={count}]", bench_generate_challan, (count,)
+    for count in sizes:
+        yield f"load_data_file[parties={count}]", bench_load_data_file, (count,)
+    for count in sizes:
+        yield f"master_data_get[parties={count}]", bench_master_data_get, (count,)
+    for count in sizes:
+        yield f"master_data_search[parties={count}]", bench_master_data_search, (count,)
+    for count in sizes:
+        yield f"item_catalog_search[items={count}]", bench_item_catalog_search, (count,)
+    for count in sizes:
+        yield f"ledger_monthly_counts[rows={count}]", bench_ledger_monthly_counts, (count,)
+    for count in ([1000, 100000] if quick else [1000, 100000, 1000000]):
+        yield f"analytics_build[items={count}]", bench_analytics_build, (count,)
+        yield f"analytics_summary[items={count}]", bench_analytics_summary, (count,)
+        yield f"search_build[items={count}]", bench_search_build, (count,)
+        yield f"search_query[items={count}]", bench_search_query, (count,)
+    yield "gui_import", bench_subprocess, (GUI_IMPORT,)
+    yield "gui_startup", bench_subprocess, (GUI_STARTUP,)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, old_path):
+    with open(old_path) as file:
+        old = json.load(file)
+    print(f"\nChange against {old_path} ({old.get('commit')}):")
+    for name, result in results["cases"].items():
+        before = old.get("cases", {}).get(name, {}).get("median_ms")
+        after = result.get("median_ms")
+        if before is None or after is None:
+            continue
+        print(f"  {name:40} {before:10.3f} -> {after:10.3f} ms  ({(after - before) / before * 100:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the challan pipeline benchmarks.")
+    parser.add_argument("--quick", action="store_true", help="skip the largest sizes")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run only cases whose name starts with one of these")
+    parser.add_argument("--output", help="JSON file to write (default: <temp>/challan_benchmarks/<commit>.json)")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="print the change against an earlier result file")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory() as work:
+        # Keep counters, ledger and challans out of the real data directory
+        Transport_Challan.COUNTER_FILE = os.path.join(work, "file_counter.json")
+        Transport_Challan.CHALLAN_DIRECTORY = os.path.join(work, "generated_challans")
+        Transport_Challan.CHALLAN_VIEWER = "none"
+        challan_ledger.LEDGER_FILE = os.path.join(work, "challan_ledger.db")
+        challan_timing.TIMING_LOG_FILE = os.path.join(work, "challan_timing.jsonl")
+        Transport_Challan.item_catalog.file_path = os.path.join(work, "item_catalog.json")
+
+        for name, bench, bench_args in cases(args.quick):
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            result = bench(work, *bench_args)
+            results["cases"][name] = result
+            if "skipped" in result:
+                print(f"{name:40} skipped: {result['skipped']}")
+            else:
+                print(f"{name:40} {result['median_ms']:10.3f} ms median ({result['runs']} runs)")
+
+    output = args.output or os.path.join(RESULTS_DIRECTORY, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=4)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Hammer the challan counter from many processes at once and check that no
+number is handed out twice and none is skipped.
+
+Run from the repository root:
+
+    python benchmarks/stress_counter.py [processes] [reservations_per_process]
+
+The counter file lives in a temporary directory, so the real
+file_counter.json is not touched. Exits with status 1 on failure.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Transport_Challan
+
+
+def hammer(args):
+    counter_file, reservations, seed = args
+    Transport_Challan.COUNTER_FILE = counter_file
+    rng = random.Random(seed)
+    numbers = []
+    for _ in range(reservations):
+        if rng.random() < 0.5:
+            numbers.append(Transport_Challan.get_next_counter())
+        else:
+            size = rng.randint(2, 20)
+            first = Transport_Challan.reserve_counters(size)
+            numbers.extend(range(first, first + size))
+    return numbers
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    reservations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as directory:
+        counter_file = os.path.join(directory, "file_counter.json")
+        start = time.perf_counter()
+        with Pool(processes) as pool:
+            results = pool.map(hammer, [(counter_file, reservations, seed) for seed in range(processes)])
+        elapsed = time.perf_counter() - start
+
+    numbers = [number for result in results for number in result]
+    duplicates = len(numbers) - len(set(numbers))
+    gaps = len(numbers) and (max(numbers) - min(numbers) + 1 - len(set(numbers)))
+    print(f"{processes} processes x {reservations} reservations: {len(numbers)} numbers in {elapsed:.2f} s")
+    print(f"duplicates: {duplicates}, gaps: {gaps}")
+    return 1 if duplicates or gaps else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
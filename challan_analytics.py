@@ -0,0 +1,245 @@
+import argparse, os
+from datetime import date
+
+import numpy as np
+
+import challan_ledger
+from challan_ledger import connect_ledger, ensure_ledger, replaced_count
+
+# Ledger rows converted to arrays at a time
+READ_CHUNK = 100000
+
+# Columns of the ledger kept in memory per ledger file, so a refresh only reads new rows
+_columns = {}
+
+
+class ChallanColumns:
+    """
+    The challan ledger as NumPy columns, for the Statistics page.
+
+    One array per field with one entry per challan (or per item line for the
+    item_* arrays). Party names and HSN codes are stored as integer codes,
+    numbered in the order they first appear (`company_codes`, `transport_codes`
+    and `hsn_codes` map them), so every group-by is a single np.bincount. Months are counted as year * 12 + month - 1, with -1
+    for challans whose date couldn't be parsed.
+
+    extend() appends the ledger rows added since the last call, and the
+    columns are saved next to the ledger so the app doesn't read the whole
+    ledger again on its next start.
+    """
+
+    CHALLAN_FIELDS = ["challan_ids", "month", "company", "transport", "discount", "gst", "amount", "net"]
+    ITEM_FIELDS = ["item_challan", "item_hsn", "item_pieces", "item_amount"]
+    CODE_FIELDS = ["company_codes", "transport_codes", "hsn_codes"]
+
+    def __init__(self):
+        for field in self.CHALLAN_FIELDS + self.ITEM_FIELDS:
+            setattr(self, field, np.zeros(0, dtype=np.int64))
+        self.company_codes = {}
+        self.transport_codes = {}
+        self.hsn_codes = {}
+        self.last_id = 0
+        self.count = 0
+        self.replaced = 0
+
+    @classmethod
+    def load(cls, path):
+        """Columns saved by save(), or None if there are none (or they can't be read)."""
+        try:
+            with np.load(path, allow_pickle=False) as saved:
+                columns = cls()
+                for field in cls.CHALLAN_FIELDS + cls.ITEM_FIELDS:
+                    setattr(columns, field, saved[field])
+                for field in cls.CODE_FIELDS:
+                    setattr(columns, field, {name: code for code, name in enumerate(saved[field].tolist())})
+                columns.last_id, columns.count, columns.replaced = (int(value) for value in saved["state"])
+        except (OSError, KeyError, ValueError):
+            return None
+        return columns
+
+    def save(self, path):
+        arrays = {field: getattr(self, field) for field in self.CHALLAN_FIELDS + self.ITEM_FIELDS}
+        for field in self.CODE_FIELDS:
+            arrays[field] = np.array(["" if name is None else str(name) for name in getattr(self, field)], dtype=str)
+        arrays["state"] = np.array([self.last_id, self.count, self.replaced], dtype=np.int64)
+        temporary_path = path + ".tmp"
+        try:
+            with open(temporary_path, "wb") as file:
+                np.savez(file, **arrays)
+            os.replace(temporary_path, path)
+        except OSError:
+            pass  # the columns are only a cache of the ledger
+
+    def extend(self, connection):
+        """Append the challans (and their items) added to the ledger since the last call."""
+        previous_id = self.last_id
+        rows = connection.execute(
+            "SELECT id, issued_on, company_name, transport_name, discount, gst, total_amount, net_amount "
+            "FROM challans WHERE id > ? ORDER BY id",
+            (self.last_id,),
+        )
+        for chunk in iter(lambda: rows.fetchmany(READ_CHUNK), []):
+            ids, issued_on, companies, transports, discount, gst, amount, net = zip(*chunk)
+            self._append({
+                "challan_ids": np.array(ids, dtype=np.int64),
+                "month": np.array([month_number(day) for day in issued_on], dtype=np.int64),
+                "company": encode(companies, self.company_codes),
+                "transport": encode(transports, self.transport_codes),
+                "discount": np.array(discount, dtype=np.int64),
+                "gst": np.array(gst, dtype=np.int64),
+                "amount": np.array(amount, dtype=np.int64),
+                "net": np.array(net, dtype=np.int64),
+            })
+            self.last_id = int(ids[-1])
+            self.count += len(chunk)
+
+        # Items are read in the order they were written; the group-bys don't need them sorted.
+        # Only the items of the challans read above: a challan committed in between
+        # is read, with its items, next time.
+        items = connection.execute(
+            "SELECT challan_id, hsn, pieces, amount FROM items WHERE challan_id > ? AND challan_id <= ?",
+            (previous_id, self.last_id),
+        )
+        for chunk in iter(lambda: items.fetchmany(READ_CHUNK), []):
+            challan_ids, hsns, pieces, amounts = zip(*chunk)
+            self._append({
+                "item_challan": np.searchsorted(self.challan_ids, np.array(challan_ids, dtype=np.int64)),
+                "item_hsn": encode(hsns, self.hsn_codes),
+                "item_pieces": np.array(pieces, dtype=np.int64),
+                "item_amount": np.array(amounts, dtype=np.int64),
+            })
+
+    def _append(self, new):
+        for field, values in new.items():
+            setattr(self, field, np.concatenate([getattr(self, field), values]))
+
+# Month number (year * 12 + month - 1) of an ISO date, -1 for no date
+def month_number(issued_on):
+    if not issued_on:
+        return -1
+    return int(issued_on[:4]) * 12 + int(issued_on[5:7]) - 1
+
+# "Jan 25" label of a month number
+def month_label(month):
+    return date(month // 12, month % 12 + 1, 1).strftime("%b %y")
+
+# Integer codes of `values` in `codes` ({value: code}), adding unseen values
+def encode(values, codes):
+    return np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype=np.int64, count=len(values))
+
+# File the columns of a ledger are saved in
+def columns_file(ledger_path):
+    return os.path.splitext(ledger_path)[0] + "_columns.npz"
+
+# Columns of the challan ledger, reading only rows added since the last call
+def load_columns(path=None):
+    """
+    Return the ChallanColumns of the ledger at `path` (LEDGER_FILE by default).
+
+    If ledger rows were replaced (a challan file recorded again) since the
+    columns were built, they are rebuilt from scratch.
+    """
+    ledger_path = path or challan_ledger.LEDGER_FILE
+    columns = _columns.get(ledger_path) or ChallanColumns.load(columns_file(ledger_path)) or ChallanColumns()
+    connection = connect_ledger(ledger_path)
+    try:
+        count, last_id = connection.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM challans").fetchone()
+        replaced = replaced_count(connection)
+        if (count, last_id, replaced) != (columns.count, columns.last_id, columns.replaced):
+            if replaced != columns.replaced:
+                columns = ChallanColumns()
+                columns.replaced = replaced
+            columns.extend(connection)
+            columns.save(columns_file(ledger_path))
+    finally:
+        connection.close()
+    _columns[ledger_path] = columns
+    return columns
+
+# Largest `limit` totals of a grouped sum, as (names, totals)
+def top_totals(codes, weights, names, limit=10):
+    """`names` lists the group names in code order."""
+    totals = np.bincount(codes, weights=weights, minlength=len(names))
+    order = np.argsort(totals, kind="stable")[::-1][:limit]
+    order = order[totals[order] > 0]
+    return [names[i] for i in order], totals[order].astype(np.int64)
+
+# Mean of each value and the `window - 1` values before it
+def rolling_mean(values, window=3):
+    sums = np.cumsum(np.asarray(values, dtype=np.float64))
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums / np.minimum(np.arange(1, len(sums) + 1), window)
+
+# Per-month counts and amounts over the last `months` months
+def monthly_totals(columns, months=12):
+    """
+    Return (labels, challan counts, net amounts, 3-month rolling net) for the
+    `months` months up to the latest challan, months without challans included.
+    """
+    dated = columns.month >= 0
+    if not dated.any():
+        return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    last = int(columns.month[dated].max())
+    first = last - months + 1
+    in_range = columns.month >= first
+    offsets = columns.month[in_range] - first
+    counts = np.bincount(offsets, minlength=months)
+    net = np.bincount(offsets, weights=columns.net[in_range], minlength=months).astype(np.int64)
+    return [month_label(month) for month in range(first, last + 1)], counts, net, rolling_mean(net)
+
+# Discount, GST and net amount per calendar year
+def yearly_totals(columns):
+    """Return (years, discount totals, GST totals, net totals), oldest year first."""
+    dated = columns.month >= 0
+    if not dated.any():
+        empty = np.zeros(0, dtype=np.int64)
+        return [], empty, empty, empty
+    years = columns.month[dated] // 12
+    first = int(years.min())
+    offsets = years - first
+    size = int(offsets.max()) + 1
+    def per_year(values):
+        return np.bincount(offsets, weights=values[dated], minlength=size).astype(np.int64)
+    return list(range(first, first + size)), per_year(columns.discount), per_year(columns.gst), per_year(columns.net)
+
+# Everything the Statistics page shows, from one pass over the columns
+def challan_summary(path=None, months=12, top=10):
+    columns = load_columns(path)
+    labels, counts, net, rolling = monthly_totals(columns, months)
+    years, discount, gst, year_net = yearly_totals(columns)
+    return {
+        "version": (columns.count, columns.last_id, columns.replaced),
+        "challans": columns.count,
+        "items": len(columns.item_hsn),
+        "months": labels,
+        "month_counts": counts,
+        "month_net": net,
+        "month_net_rolling": rolling,
+        "suppliers": top_totals(columns.company, columns.net, list(columns.company_codes), top),
+        "customers": top_totals(columns.transport, columns.net, list(columns.transport_codes), top),
+        "hsn_pieces": top_totals(columns.item_hsn, columns.item_pieces, list(columns.hsn_codes), top),
+        "years": years,
+        "year_discount": discount,
+        "year_gst": gst,
+        "year_net": year_net,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print challan statistics from the ledger.")
+    parser.add_argument("--months", type=int, default=12, help="number of months to show (default: 12)")
+    parser.add_argument("--top", type=int, default=10, help="number of suppliers, customers and HSN codes to show (default: 10)")
+    args = parser.parse_args()
+    ensure_ledger()
+    summary = challan_summary(months=args.months, top=args.top)
+    print(f"{summary['challans']} challans, {summary['items']} item lines")
+    print("\nMonth      challans        net   3-month avg")
+    for label, count, net, rolling in zip(summary["months"], summary["month_counts"], summary["month_net"], summary["month_net_rolling"]):
+        print(f"{label:10} {count:8d} {net:10d} {rolling:13.0f}")
+    for title, key in (("Revenue per supplier", "suppliers"), ("Top customers", "customers"), ("Pieces per HSN code", "hsn_pieces")):
+        print(f"\n{title}:")
+        for name, total in zip(*summary[key]):
+            print(f"  {name:40} {total:12d}")
+    print("\nYear     discount        GST        net")
+    for year, discount, gst, net in zip(summary["years"], summary["year_discount"], summary["year_gst"], summary["year_net"]):
+        print(f"{year:4d} {discount:12d} {gst:10d} {net:10d}")
@@ -0,0 +1,147 @@
+import json, os, queue, threading, time
+
+DRAFT_FILE = r"Data\challan_draft.journal"
+
+# Seconds the writer waits after a change for more before writing and fsyncing
+DRAFT_DELAY = 0.3
+
+# Queued in place of a record to start a new, empty draft
+_RESET = object()
+_STOP = object()
+
+
+class DraftJournal:
+    """
+    Write-ahead journal of the challan being typed on the Home page, so it
+    survives a crash or a reboot.
+
+    append() only queues a record, so it costs the Tk thread next to
+    nothing. A background thread collects what arrives within DRAFT_DELAY of
+    the first change, then appends it as JSON lines and fsyncs once. A
+    record of the form is either {"fields": {...}} (every form field; the
+    last one wins), {"item": [name, hsn, pieces, amount]} or
+    {"clear": "items"}.
+
+    A submitted challan gets a record of its own, {"job": n, "fields": {...},
+    "items": [...]}, from submit() until finish() adds {"done": n} once it has
+    been written, so a crash in between loses neither the challan nor its
+    draft. reset() starts the journal again with only the submitted challans
+    that are still pending. A torn last line is ignored by load() and cut off.
+    """
+
+    def __init__(self, path=None, delay=DRAFT_DELAY):
+        self.path = path or DRAFT_FILE
+        self.delay = delay
+        self.records = queue.Queue()
+        # Submitted challans not finished yet: job number -> record
+        self.pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_job = 1
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def load(self):
+        """
+        Return the draft in the journal as (fields, items, jobs), where jobs
+        lists (job, fields, items) of every submitted challan not finished.
+        """
+        fields, items = {}, []
+        jobs = {}
+        good_length = 0
+        try:
+            with open(self.path, "rb+") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good_length += len(line)
+                    if "job" in record:
+                        jobs[record["job"]] = record
+                    elif "done" in record:
+                        jobs.pop(record["done"], None)
+                    elif "fields" in record:
+                        fields = record["fields"]
+                    elif "item" in record:
+                        items.append(tuple(record["item"]))
+                    elif record.get("clear") == "items":
+                        items.clear()
+                file.truncate(good_length)
+        except FileNotFoundError:
+            pass
+        with self._pending_lock:
+            self.pending.update(jobs)
+            self._next_job = max(self.pending, default=0) + 1
+        return fields, items, [(job, record["fields"], [tuple(item) for item in record["items"]]) for job, record in sorted(jobs.items())]
+
+    def append(self, record):
+        self.records.put(record)
+
+    def reset(self):
+        self.records.put(_RESET)
+
+    def submit(self, fields, items):
+        """Journal a submitted challan and return its job number for finish()."""
+        with self._pending_lock:
+            job = self._next_job
+            self._next_job += 1
+            record = {"job": job, "fields": fields, "items": [list(item) for item in items]}
+            self.pending[job] = record
+        self.records.put(record)
+        return job
+
+    def finish(self, job):
+        """Drop a submitted challan from the journal, e.g. once it has been written."""
+        with self._pending_lock:
+            self.pending.pop(job, None)
+        self.records.put({"done": job})
+
+    def close(self):
+        """Write what is still queued and stop the writer."""
+        self.records.put(_STOP)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            batch = [self.records.get()]
+            if batch[0] is not _STOP:
+                time.sleep(self.delay)
+            while True:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except OSError as exc:
+                print(f"Error: could not save the challan draft: {exc}")
+            if _STOP in batch:
+                return
+
+    def _write(self, batch):
+        reset = False
+        lines = []
+        for record in batch:
+            if record is _RESET:
+                reset = True
+                with self._pending_lock:
+                    lines = list(self.pending.values())
+            elif record is not _STOP:
+                lines.append(record)
+        if not reset and not lines:
+            return
+        # Only the last field snapshot of the form in a batch matters
+        def is_form_fields(record):
+            return "fields" in record and "job" not in record
+        last_fields = max((i for i, record in enumerate(lines) if is_form_fields(record)), default=None)
+        text = "".join(
+            json.dumps(record, separators=(",", ":")) + "\n"
+            for i, record in enumerate(lines) if not is_form_fields(record) or i == last_fields
+        )
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w" if reset else "a") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
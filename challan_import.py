@@ -0,0 +1,124 @@
+import argparse, json, os, time
+from concurrent.futures import ProcessPoolExecutor
+
+from challan_ledger import connect_ledger, read_challan_file, record_challans
+
+# Records written to the output (and ledger) at a time; at most this many are read again after a crash
+CHECKPOINT_EVERY = 500
+
+# Files handed to a worker process at a time
+WORKER_CHUNK = 16
+
+# Challan workbooks in a directory, in name order
+def challan_files(directory):
+    return [
+        os.path.join(directory, file) for file in sorted(os.listdir(directory))
+        if file.startswith("transport_challan") and file.endswith(".xlsx")
+    ]
+
+# Files already in a JSONL output, dropping a line cut off by a crash
+def completed_files(path):
+    """
+    Return the "file" of every complete line of `path`. A last line without
+    a newline (or that isn't valid JSON) is cut off so the file can be
+    appended to again.
+    """
+    done = set()
+    good_length = 0
+    try:
+        with open(path, "rb+") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    done.add(json.loads(line)["file"])
+                except (ValueError, KeyError):
+                    break
+                good_length += len(line)
+            file.truncate(good_length)
+    except FileNotFoundError:
+        pass
+    return done
+
+# Read one workbook in a worker process
+def _read_file(file_path):
+    try:
+        return read_challan_file(file_path), None
+    except Exception as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+
+# Read every challan workbook of a directory into one JSONL file
+def import_challans(directory, output, workers=4, ledger=False, progress=None):
+    """
+    Read the challan workbooks in `directory` with openpyxl's read-only
+    reader, spread over `workers` processes, and append one ledger record per
+    challan (fields plus an "items" list) to the JSONL file `output`.
+
+    The output is also the checkpoint: files already in it are skipped, so an
+    interrupted import carries on where it stopped. Files that can't be read
+    go to `output` + ".failed" with the error and are skipped as well; delete
+    that file to try them again. With ledger=True the records are also added
+    to the challan ledger, except files it already has. Each batch of
+    records is committed to the ledger before its lines are written, so a
+    file in the output is always in the ledger too.
+
+    `progress(done, total)` is called now and then. Returns
+    (imported, failed, skipped).
+    """
+    files = challan_files(directory)
+    failed_path = output + ".failed"
+    done = completed_files(output) | completed_files(failed_path)
+    todo = [file for file in files if file not in done]
+
+    known = set()
+    if ledger:
+        connection = connect_ledger()
+        try:
+            known = {row[0] for row in connection.execute("SELECT file FROM challans")}
+        finally:
+            connection.close()
+
+    imported = failed = 0
+    pending = []
+    pending_failures = []
+    with open(output, "a") as out, open(failed_path, "a") as failures, ProcessPoolExecutor(max_workers=workers) as executor:
+        def checkpoint():
+            if ledger:
+                record_challans([record for record in pending if record["file"] not in known])
+            out.writelines(json.dumps(record) + "\n" for record in pending)
+            failures.writelines(json.dumps(failure) + "\n" for failure in pending_failures)
+            pending.clear()
+            pending_failures.clear()
+            for file in (out, failures):
+                file.flush()
+                os.fsync(file.fileno())
+
+        for file_path, (record, error) in zip(todo, executor.map(_read_file, todo, chunksize=WORKER_CHUNK)):
+            if error is None:
+                pending.append(record)
+                imported += 1
+            else:
+                pending_failures.append({"file": file_path, "error": error})
+                failed += 1
+            if (imported + failed) % CHECKPOINT_EVERY == 0:
+                checkpoint()
+                if progress is not None:
+                    progress(imported + failed, len(todo))
+        checkpoint()
+    return imported, failed, len(files) - len(todo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import existing challan workbooks into one JSONL file, in parallel and resumably.")
+    parser.add_argument("directory", nargs="?", default="generated_challans", help="directory with the challan workbooks (default: generated_challans)")
+    parser.add_argument("--output", default="challans.jsonl", help="JSONL file to write; also the checkpoint (default: challans.jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="number of reader processes (default: one per core)")
+    parser.add_argument("--ledger", action="store_true", help="also add the challans to the challan ledger")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    def progress(done, total):
+        elapsed = time.perf_counter() - start
+        print(f"{done}/{total} files, {done / elapsed:.0f} files/s")
+    imported, failed, skipped = import_challans(args.directory, args.output, args.workers, args.ledger, progress)
+    print(f"{imported} imported, {failed} failed (see {args.output}.failed), {skipped} already done, in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,337 @@
+import argparse, os, re, sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# SQLite ledger of every issued challan
+LEDGER_FILE = r"Data\challan_ledger.db"
+
+LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS challans (
+    id INTEGER PRIMARY KEY,
+    counter INTEGER,
+    challan_number TEXT,
+    date TEXT,
+    issued_on TEXT,
+    company_name TEXT,
+    transport_name TEXT,
+    contact_no TEXT,
+    discount INTEGER,
+    gst INTEGER,
+    total_pieces INTEGER,
+    total_amount INTEGER,
+    net_amount INTEGER,
+    other_party_goods TEXT,
+    other_party_amount TEXT,
+    file TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS items (
+    challan_id INTEGER REFERENCES challans(id),
+    line_no INTEGER,
+    item_name TEXT,
+    hsn TEXT,
+    pieces INTEGER,
+    amount INTEGER
+);
+CREATE TABLE IF NOT EXISTS ledger_info (
+    name TEXT PRIMARY KEY,
+    value INTEGER
+);
+CREATE INDEX IF NOT EXISTS challans_issued_on ON challans(issued_on);
+CREATE INDEX IF NOT EXISTS challans_company ON challans(company_name);
+CREATE INDEX IF NOT EXISTS challans_transport ON challans(transport_name);
+CREATE INDEX IF NOT EXISTS challans_counter ON challans(counter);
+CREATE INDEX IF NOT EXISTS items_challan ON items(challan_id);
+"""
+
+# Hold an exclusive lock on a lock file, across processes
+@contextmanager
+def file_lock(lock_path):
+    with open(lock_path, "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+# Open the ledger, creating the tables on first use
+def connect_ledger(path=None):
+    connection = sqlite3.connect(path or LEDGER_FILE)
+    connection.executescript(LEDGER_SCHEMA)
+    return connection
+
+# Convert a challan date (DD.MM.YY) to ISO format, or None if it can't be parsed
+def parse_challan_date(date):
+    for fmt in ("%d.%m.%y", "%d.%m.%Y", "%d_%m_%y"):
+        try:
+            return datetime.strptime(str(date).strip(), fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+# Build one ledger record from the generate_challan arguments
+def challan_record(counter, file, contact_no, company_name, transport_name, items_data, discount, gst, date, challan_number, No_of_Other_Party_Goods, Amount_of_Other_Party_Goods):
+    total_pieces = sum(item[2] for item in items_data)
+    total_amount = sum(item[3] for item in items_data)
+    return {
+        "counter": counter,
+        "challan_number": str(challan_number),
+        "date": date,
+        "issued_on": parse_challan_date(date),
+        "company_name": company_name,
+        "transport_name": transport_name,
+        "contact_no": str(contact_no),
+        "discount": discount,
+        "gst": gst,
+        "total_pieces": total_pieces,
+        "total_amount": total_amount,
+        "net_amount": total_amount - discount + gst,
+        "other_party_goods": str(No_of_Other_Party_Goods),
+        "other_party_amount": str(Amount_of_Other_Party_Goods),
+        "file": file,
+        "items": [tuple(item) for item in items_data],
+    }
+
+# Append challan records to the ledger in one transaction
+def record_challans(records, path=None):
+    columns = [
+        "counter", "challan_number", "date", "issued_on", "company_name", "transport_name", "contact_no",
+        "discount", "gst", "total_pieces", "total_amount", "net_amount", "other_party_goods",
+        "other_party_amount", "file",
+    ]
+    insert = f"INSERT INTO challans ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    connection = connect_ledger(path)
+    try:
+        with connection:
+            for record in records:
+                # A file that is recorded again replaces its earlier entry
+                connection.execute("DELETE FROM items WHERE challan_id IN (SELECT id FROM challans WHERE file = ?)", (record["file"],))
+                if connection.execute("DELETE FROM challans WHERE file = ?", (record["file"],)).rowcount:
+                    # Lets readers that only fetch new rows see that older ones changed
+                    connection.execute(
+                        "INSERT INTO ledger_info (name, value) VALUES ('replaced', 1) "
+                        "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+                    )
+                cursor = connection.execute(insert, [record[column] for column in columns])
+                connection.executemany(
+                    "INSERT INTO items (challan_id, line_no, item_name, hsn, pieces, amount) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, line_no, *item) for line_no, item in enumerate(record["items"], start=1)],
+                )
+    finally:
+        connection.close()
+
+# Append a single challan to the ledger
+def record_challan(record, path=None):
+    record_challans([record], path)
+
+# Number of times a recorded challan has been replaced in the ledger
+def replaced_count(connection):
+    row = connection.execute("SELECT value FROM ledger_info WHERE name = 'replaced'").fetchone()
+    return row[0] if row else 0
+
+# The ledger "file" of a challan kept in a monthly archive is ARCHIVE_PREFIX + "<archive path>#<offset>"
+ARCHIVE_PREFIX = "archive:"
+
+# Archive references recorded before they had ARCHIVE_PREFIX
+LEGACY_ARCHIVE_REFERENCE = re.compile(r"challan_archive_\d{4}_\d{2}\.jsonl#\d+$")
+
+# Whether a ledger "file" is a monthly archive entry rather than the path of a workbook
+def is_archive_reference(reference):
+    """A "#" alone doesn't tell: per-file challan names contain the party names as typed."""
+    return reference.startswith(ARCHIVE_PREFIX) or bool(LEGACY_ARCHIVE_REFERENCE.match(os.path.basename(reference)))
+
+# Look up where challan `counter` was stored (a file path or an archive reference)
+def challan_file_for_counter(counter, path=None):
+    connection = connect_ledger(path)
+    try:
+        row = connection.execute("SELECT file FROM challans WHERE counter = ? ORDER BY id DESC LIMIT 1", (counter,)).fetchone()
+    finally:
+        connection.close()
+    return row[0] if row else None
+
+# Files (or archive references) of every challan issued on one ISO date, in counter order
+def challan_files_on(issued_on, path=None):
+    connection = connect_ledger(path)
+    try:
+        rows = connection.execute("SELECT file FROM challans WHERE issued_on = ? ORDER BY counter", (issued_on,)).fetchall()
+    finally:
+        connection.close()
+    return [row[0] for row in rows]
+
+# (item_name, hsn, amount) of every item line, oldest challan first
+def item_rows(path=None):
+    connection = connect_ledger(path)
+    try:
+        return connection.execute("SELECT item_name, hsn, amount FROM items ORDER BY challan_id, line_no").fetchall()
+    finally:
+        connection.close()
+
+# Names of the items last sent to one customer, most recent first, each once
+def recent_customer_items(transport_name, limit=20, path=None):
+    connection = connect_ledger(path)
+    try:
+        rows = connection.execute(
+            "SELECT items.item_name FROM challans JOIN items ON items.challan_id = challans.id "
+            "WHERE challans.transport_name = ? ORDER BY challans.id DESC, items.line_no LIMIT ?",
+            (transport_name, limit * 10),
+        ).fetchall()
+    finally:
+        connection.close()
+    return list(dict.fromkeys(row[0] for row in rows))[:limit]
+
+# Count challans per calendar month, oldest first
+def monthly_counts(months=12, path=None):
+    """
+    Return a list of ("YYYY-MM", count) pairs for the last `months` months
+    that have challans, oldest first. Years are kept apart.
+    """
+    connection = connect_ledger(path)
+    try:
+        rows = connection.execute(
+            "SELECT substr(issued_on, 1, 7) AS month, COUNT(*) FROM challans "
+            "WHERE issued_on IS NOT NULL GROUP BY month ORDER BY month DESC LIMIT ?",
+            (months,),
+        ).fetchall()
+    finally:
+        connection.close()
+    return rows[::-1]
+
+# Rows of one printed challan page, also used by the streaming writer; multi-page challans repeat the layout
+CHALLAN_PAGE_ROWS = 32
+
+# Rows of the item table on each page
+CHALLAN_ITEM_FIRST_ROW = 14
+CHALLAN_ITEM_ROWS = 7
+
+# Read the fields generate_challan wrote into an existing challan workbook
+def read_challan_file(file_path):
+    """
+    Return the ledger record of a saved challan workbook.
+
+    Multi-page challans (written by write_challan_streaming) are read page by
+    page: the items of every page, the header of the first and the totals of
+    the last.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        ws = wb.active
+        cells = {}
+        for row in ws.iter_rows(max_col=10):
+            for cell in row:
+                if cell.value is not None:
+                    cells[cell.coordinate] = cell.value
+    finally:
+        wb.close()
+
+    last_row = max((int(coordinate.lstrip("ABCDEFGHIJ")) for coordinate in cells), default=1)
+    pages = (last_row - 1) // CHALLAN_PAGE_ROWS + 1
+    footer = (pages - 1) * CHALLAN_PAGE_ROWS
+
+    def number(coordinate):
+        value = cells.get(coordinate)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
+
+    items_data = []
+    for page in range(pages):
+        first_row = CHALLAN_ITEM_FIRST_ROW + page * CHALLAN_PAGE_ROWS
+        for row in range(first_row, first_row + CHALLAN_ITEM_ROWS):
+            if cells.get(f"B{row}") is None:
+                continue
+            items_data.append((str(cells[f"B{row}"]), str(cells.get(f"F{row}", "")), number(f"H{row}"), number(f"I{row}")))
+
+    counter = os.path.splitext(os.path.basename(file_path))[0].rsplit("_", 1)[-1]
+    return challan_record(
+        counter=int(counter) if counter.isdigit() else None,
+        file=file_path,
+        contact_no=cells.get("H6", ""),
+        company_name=str(cells.get("A2", "")),
+        transport_name=str(cells.get("A9", "")),
+        items_data=items_data,
+        discount=number(f"H{22 + footer}"),
+        gst=number(f"H{24 + footer}"),
+        date=str(cells.get("I10", "")),
+        challan_number=cells.get("I9", ""),
+        No_of_Other_Party_Goods=cells.get(f"A{28 + footer}", ""),
+        Amount_of_Other_Party_Goods=cells.get(f"F{28 + footer}", ""),
+    )
+
+# One-time import of challan files saved before the ledger existed
+def backfill_ledger(directory="generated_challans", path=None):
+    """Add every challan workbook in `directory` that the ledger doesn't know about yet."""
+    if not os.path.isdir(directory):
+        return 0
+    connection = connect_ledger(path)
+    try:
+        known = {row[0] for row in connection.execute("SELECT file FROM challans")}
+    finally:
+        connection.close()
+
+    records = []
+    for file in sorted(os.listdir(directory)):
+        file_path = os.path.join(directory, file)
+        if not (file.startswith("transport_challan") and file.endswith(".xlsx")) or file_path in known:
+            continue
+        try:
+            records.append(read_challan_file(file_path))
+        except Exception as exc:
+            print(f"Skipping {file_path}: {exc}")
+    record_challans(records, path)
+    return len(records)
+
+# Import the challans already on disk the first time the ledger is used.
+# Any connect_ledger() call creates the file, so a flag in ledger_info
+# records that the backfill ran rather than whether the file exists.
+def ensure_ledger(directory="generated_challans", path=None):
+    path = path or LEDGER_FILE
+    if _backfilled(path):
+        return
+    # The Statistics page and the item catalog may both get here at startup; one backfills
+    with file_lock(path + ".backfill.lock"):
+        if _backfilled(path):
+            return
+        backfill_ledger(directory, path)
+        connection = connect_ledger(path)
+        try:
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO ledger_info (name, value) VALUES ('backfilled', 1)")
+        finally:
+            connection.close()
+
+# Whether ensure_ledger() has already imported the old challan files into the ledger at `path`
+def _backfilled(path):
+    connection = connect_ledger(path)
+    try:
+        return connection.execute("SELECT value FROM ledger_info WHERE name = 'backfilled'").fetchone() is not None
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the challan ledger.")
+    parser.add_argument("--backfill", metavar="DIRECTORY", nargs="?", const="generated_challans",
+                        help="import challan files saved before the ledger existed")
+    args = parser.parse_args()
+    if args.backfill:
+        print(f"Imported {backfill_ledger(args.backfill)} challans into {LEDGER_FILE}")
+    else:
+        ensure_ledger()
+        for month, count in monthly_counts():
+            print(f"{month}: {count}")
@@ -0,0 +1,185 @@
+import argparse, io, math, os
+
+from openpyxl import load_workbook
+
+from challan_ledger import CHALLAN_PAGE_ROWS, challan_files_on, is_archive_reference, parse_challan_date
+
+# A4 portrait, in points
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+PAGE_MARGIN = 36
+
+# Rows and columns taken up by one printed challan page
+PAGE_ROWS = CHALLAN_PAGE_ROWS
+PAGE_COLUMNS = 10
+
+DEFAULT_COLUMN_WIDTH = 8.43  # Excel's default, in characters
+DEFAULT_ROW_HEIGHT = 15.0    # points
+DEFAULT_FONT_SIZE = 11
+
+# Width of an Excel column (in characters) in points, the way Excel converts it
+def column_width_points(width):
+    pixels = math.floor(width * 7 + 5)
+    return pixels * 0.75
+
+# Work out where every column and row of one page starts, in points from the top-left corner
+def _page_grid(ws, first_row):
+    widths = []
+    for col in range(1, PAGE_COLUMNS + 1):
+        dim = ws.column_dimensions.get(chr(ord("A") + col - 1))
+        widths.append(column_width_points(dim.width if dim is not None and dim.width else DEFAULT_COLUMN_WIDTH))
+    heights = []
+    for row in range(first_row, first_row + PAGE_ROWS):
+        dim = ws.row_dimensions.get(row)
+        heights.append(dim.height if dim is not None and dim.height else DEFAULT_ROW_HEIGHT)
+
+    xs = [0.0]
+    for width in widths:
+        xs.append(xs[-1] + width)
+    ys = [0.0]
+    for height in heights:
+        ys.append(ys[-1] + height)
+    return xs, ys
+
+# Map every cell of a merged range to the range's bounds (min_col, min_row, max_col, max_row)
+def _merge_map(ws):
+    merged = {}
+    for merged_range in ws.merged_cells.ranges:
+        bounds = merged_range.bounds
+        for row in range(bounds[1], bounds[3] + 1):
+            for col in range(bounds[0], bounds[2] + 1):
+                merged[(row, col)] = bounds
+    return merged
+
+# Draw one printed page (rows first_row .. first_row + PAGE_ROWS - 1) onto a figure
+def _draw_page(fig, ws, first_row, merged, cells):
+    xs, ys = _page_grid(ws, first_row)
+    scale = min((PAGE_WIDTH - 2 * PAGE_MARGIN) / xs[-1], (PAGE_HEIGHT - 2 * PAGE_MARGIN) / ys[-1], 1.5)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(0, PAGE_WIDTH)
+    ax.set_ylim(PAGE_HEIGHT, 0)
+    ax.axis("off")
+
+    def x(col):
+        return PAGE_MARGIN + xs[col - 1] * scale
+
+    def y(row):
+        return PAGE_MARGIN + ys[row - first_row] * scale
+
+    last_row = first_row + PAGE_ROWS - 1
+    segments = []
+    for row in range(first_row, last_row + 1):
+        for col in range(1, PAGE_COLUMNS + 1):
+            cell = cells.get((row, col))
+            bounds = merged.get((row, col), (col, row, col, row))
+            if cell is not None and cell.has_style:
+                border = cell.border
+                # Inside a merged range only the outer edges are drawn, as in Excel
+                if border.left.style and col == bounds[0]:
+                    segments.append(((x(col), y(row)), (x(col), y(row + 1))))
+                if border.right.style and col == bounds[2]:
+                    segments.append(((x(col + 1), y(row)), (x(col + 1), y(row + 1))))
+                if border.top.style and row == bounds[1]:
+                    segments.append(((x(col), y(row)), (x(col + 1), y(row))))
+                if border.bottom.style and row == bounds[3]:
+                    segments.append(((x(col), y(row + 1)), (x(col + 1), y(row + 1))))
+
+            if cell is None or cell.value is None or (col, row) != bounds[:2]:
+                continue
+            left, top = x(bounds[0]), y(bounds[1])
+            right, bottom = x(bounds[2] + 1), y(min(bounds[3], last_row) + 1)
+            horizontal = cell.alignment.horizontal or ("right" if isinstance(cell.value, (int, float)) else "left")
+            vertical = cell.alignment.vertical or "bottom"
+            if horizontal == "center":
+                text_x, ha = (left + right) / 2, "center"
+            elif horizontal == "right":
+                text_x, ha = right - 2, "right"
+            else:
+                text_x, ha = left + 2, "left"
+            if vertical == "center":
+                text_y, va = (top + bottom) / 2, "center"
+            elif vertical == "top":
+                text_y, va = top + 1, "top"
+            else:
+                text_y, va = bottom - 2, "bottom"
+            ax.text(
+                text_x, text_y, str(cell.value), ha=ha, va=va,
+                fontsize=(cell.font.sz or DEFAULT_FONT_SIZE) * scale * 0.85,
+                fontweight="bold" if cell.font.b else "normal",
+                clip_on=True,
+            )
+
+    if segments:
+        from matplotlib.collections import LineCollection
+        ax.add_collection(LineCollection(segments, colors="black", linewidths=0.5 * scale))
+
+# Render every page of the given challan worksheets into one PDF
+def write_challans_pdf(worksheets, pdf_path):
+    """
+    Draw the challan layout of each worksheet (merged cells, borders, fonts and
+    values) straight to `pdf_path`, one PDF page per 32-row challan page, all in
+    a single file. Works headless, no Excel needed. Returns the number of pages.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    pages = 0
+    with PdfPages(pdf_path) as pdf:
+        for ws in worksheets:
+            merged = _merge_map(ws)
+            cells = {(cell.row, cell.column): cell for row in ws.iter_rows() for cell in row}
+            for first_row in range(1, max(ws.max_row, PAGE_ROWS) + 1, PAGE_ROWS):
+                fig = Figure(figsize=(PAGE_WIDTH / 72, PAGE_HEIGHT / 72))
+                _draw_page(fig, ws, first_row, merged, cells)
+                pdf.savefig(fig)
+                pages += 1
+    return pages
+
+# Load the challan worksheets saved in .xlsx files
+def load_challan_worksheets(file_paths):
+    for file_path in file_paths:
+        yield load_workbook(file_path).active
+
+# Render saved challan workbooks to one PDF
+def challan_files_to_pdf(file_paths, pdf_path):
+    return write_challans_pdf(load_challan_worksheets(file_paths), pdf_path)
+
+# Render every challan of one day from the ledger to one PDF
+def day_to_pdf(date, pdf_path):
+    """`date` is a challan date (DD.MM.YY); archived challans are rebuilt from their archive line."""
+    from Transport_Challan import build_challan_workbook, read_archived_challan, ITEM_ROWS, write_challan_streaming
+
+    issued_on = parse_challan_date(date)
+    if issued_on is None:
+        raise ValueError(f"Not a challan date (DD.MM.YY): {date}")
+
+    def worksheets():
+        for reference in challan_files_on(issued_on):
+            if not is_archive_reference(reference):
+                yield load_workbook(reference).active
+                continue
+            company_data, transport_data, arguments = read_archived_challan(reference)
+            if len(arguments[3]) <= ITEM_ROWS:
+                yield build_challan_workbook(company_data, transport_data, *arguments).active
+            else:
+                buffer = io.BytesIO()
+                write_challan_streaming(buffer, company_data, transport_data, *arguments)
+                yield load_workbook(buffer).active
+
+    return write_challans_pdf(worksheets(), pdf_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render challans to a PDF without opening Excel.")
+    parser.add_argument("pdf", help="PDF file to write")
+    parser.add_argument("files", nargs="*", help="challan .xlsx files to render")
+    parser.add_argument("--day", metavar="DD.MM.YY", help="render every challan issued on this date, from the ledger")
+    args = parser.parse_args()
+    if args.day:
+        try:
+            pages = day_to_pdf(args.day, args.pdf)
+        except ValueError as exc:
+            parser.error(str(exc))
+    else:
+        pages = challan_files_to_pdf(args.files, args.pdf)
+    print(f"Wrote {pages} page(s) to {args.pdf}")
@@ -0,0 +1,289 @@
+import argparse, heapq, re, sys, time
+from bisect import bisect_left
+
+import challan_ledger
+from challan_ledger import connect_ledger, ensure_ledger, parse_challan_date, replaced_count
+from name_index import WORD_PATTERN, normalize_name
+
+# Fields a query can name, e.g. customer:"XYZ FAB" hsn:5407 no:123
+SEARCH_FIELDS = ("supplier", "customer", "item", "hsn", "no")
+
+# field:value, field:"several words", "several words" or a single word
+QUERY_PATTERN = re.compile(r'(\w+):"([^"]*)"|(\w+):(\S+)|"([^"]*)"|(\S+)')
+
+# Search indexes kept in memory per ledger file, so a search only reads new rows
+_indexes = {}
+
+
+class FieldIndex:
+    """Sorted tokens of one field with the ids of the challans containing each, in ledger order."""
+
+    def __init__(self):
+        self.tokens = []
+        self.postings = {}
+
+    def add(self, token, challan_id):
+        ids = self.postings.get(token)
+        if ids is None:
+            self.postings[token] = [challan_id]
+            self.tokens.append(token)
+        elif ids[-1] != challan_id:
+            ids.append(challan_id)
+
+
+class ChallanSearchIndex:
+    """
+    Inverted index over the challan ledger.
+
+    Supplier, customer and item names are split into words; HSN codes and
+    challan numbers are kept whole. Every term of a query matches token
+    prefixes, so "TEX" finds "TEXTILES". Dates are a sorted list of
+    (ISO date, id) pairs, searched by bisection.
+
+    Each challan's own tokens are kept too (`challan_tokens`, one tuple per
+    field), so a term can be checked against a single challan without
+    collecting every challan it matches.
+
+    extend() adds the challans recorded since the last call; postings stay
+    in ledger order because new challans always get higher ids.
+    """
+
+    def __init__(self):
+        self.fields = {field: FieldIndex() for field in SEARCH_FIELDS}
+        self.dates = []
+        self.challan_tokens = {}
+        self.challan_dates = {}
+        self.last_id = 0
+        self.count = 0
+        self.replaced = 0
+
+    def extend(self, connection):
+        previous_id = self.last_id
+        rows = connection.execute(
+            "SELECT id, challan_number, issued_on, company_name, transport_name FROM challans WHERE id > ? ORDER BY id",
+            (previous_id,),
+        ).fetchall()
+        if not rows:
+            return
+
+        items = {}
+        for challan_id, item_name, hsn_code in connection.execute(
+            "SELECT challan_id, item_name, hsn FROM items WHERE challan_id > ?", (previous_id,)
+        ):
+            words, hsns = items.setdefault(challan_id, (set(), set()))
+            words.update(WORD_PATTERN.findall(normalize_name(item_name or "")))
+            hsns.add(normalize_name(hsn_code or ""))
+
+        no_items = (set(), set())
+        for challan_id, challan_number, issued_on, company_name, transport_name in rows:
+            item_words, hsns = items.get(challan_id, no_items)
+            tokens = (
+                WORD_PATTERN.findall(normalize_name(company_name or "")),
+                WORD_PATTERN.findall(normalize_name(transport_name or "")),
+                item_words,
+                hsns,
+                [normalize_name(challan_number or "")],
+            )
+            # One shared string per distinct token keeps the per-challan tuples small
+            tokens = tuple(tuple(sys.intern(token) for token in field_tokens) for field_tokens in tokens)
+            self.challan_tokens[challan_id] = tokens
+            for field, field_tokens in zip(self.fields.values(), tokens):
+                for token in field_tokens:
+                    field.add(token, challan_id)
+            if issued_on:
+                self.dates.append((issued_on, challan_id))
+                self.challan_dates[challan_id] = issued_on
+
+        # Appended runs are already sorted, so these sorts are close to linear
+        for field in self.fields.values():
+            field.tokens.sort()
+        self.dates.sort()
+        self.last_id = rows[-1][0]
+        self.count += len(rows)
+
+    def date_term(self, first, last):
+        """Term matching challans dated from ISO date `first` to `last`, inclusive."""
+        start = bisect_left(self.dates, (first,))
+        end = bisect_left(self.dates, (last + "\uffff",))
+        return DateTerm(self, first, last, end - start, start, end)
+
+    def word_term(self, field, word):
+        """Term matching challans with a token starting with `word` in `field` (any field for None)."""
+        names = SEARCH_FIELDS if field is None else [field]
+        ranges = []
+        for name in names:
+            index = self.fields[name]
+            ranges.append((index, bisect_left(index.tokens, word), bisect_left(index.tokens, word + "\uffff")))
+        return WordTerm(self, [SEARCH_FIELDS.index(name) for name in names], word, ranges)
+
+    def terms(self, query):
+        """The terms of `query` that can be searched; from: and to: make one date range."""
+        terms = []
+        first, last = "0000", "9999"
+        for field, value in parse_query(query):
+            if field in ("date", "from", "to"):
+                # DD.MM.YY for one day, or an ISO prefix such as 2025 or 2025-07
+                day = parse_challan_date(value) or (value if re.fullmatch(r"\d{4}(-\d\d){0,2}", value) else None)
+                if day is None:
+                    continue
+                if field == "date":
+                    terms.append(self.date_term(day, day))
+                elif field == "from":
+                    first = max(first, day)
+                else:
+                    last = min(last, day)
+            elif field in ("hsn", "no"):
+                terms.append(self.word_term(field, normalize_name(value)))
+            elif field is None or field in self.fields:
+                terms.extend(self.word_term(field, word) for word in WORD_PATTERN.findall(normalize_name(value)))
+        if (first, last) != ("0000", "9999"):
+            terms.append(self.date_term(first, last))
+        return terms
+
+    def search(self, query, limit=100):
+        """
+        Return the ids of up to `limit` challans matching every term of
+        `query`, newest first. Terms are words (any field), supplier:,
+        customer:, item:, hsn:, no:, date:, from: and to:; put several words
+        in quotes, e.g. customer:"XYZ FAB".
+
+        The term with the fewest matches is walked newest first and the other
+        terms are only checked for the challans it yields, so the search stops
+        as soon as `limit` challans are found.
+        """
+        terms = self.terms(query)
+        if not terms:
+            return []
+        terms.sort(key=lambda term: term.estimate)
+        lead, others = terms[0], terms[1:]
+        result = []
+        for challan_id in lead.ids():
+            if all(term.contains(challan_id) for term in others):
+                result.append(challan_id)
+                if len(result) >= limit:
+                    break
+        return result
+
+
+class WordTerm:
+    """Challans with a token starting with `word` in some fields."""
+
+    # Tokens whose postings are counted for the estimate; beyond this it is extrapolated
+    ESTIMATE_TOKENS = 64
+
+    # Above this many tokens, ids() checks every challan newest first instead of merging postings
+    MERGE_TOKENS = 256
+
+    def __init__(self, index, positions, word, ranges):
+        self.index = index
+        self.positions = positions
+        self.word = word
+        self.ranges = ranges
+        sizes = []
+        for field, start, end in ranges:
+            sizes.extend(len(field.postings[token]) for token in field.tokens[start:min(end, start + self.ESTIMATE_TOKENS)])
+        self.tokens = sum(end - start for _, start, end in ranges)
+        self.estimate = sum(sizes) * self.tokens / len(sizes) if sizes else 0
+
+    def ids(self):
+        """Matching ids, newest first, each once."""
+        if self.tokens > self.MERGE_TOKENS:
+            # A prefix like "1" matches most challans, so the next match is never far away
+            yield from (challan_id for challan_id in reversed(self.index.challan_tokens) if self.contains(challan_id))
+            return
+        postings = [field.postings[token] for field, start, end in self.ranges for token in field.tokens[start:end]]
+        previous = None
+        for challan_id in heapq.merge(*(reversed(ids) for ids in postings), reverse=True):
+            if challan_id != previous:
+                yield challan_id
+                previous = challan_id
+
+    def contains(self, challan_id):
+        tokens = self.index.challan_tokens.get(challan_id, ())
+        return any(token.startswith(self.word) for position in self.positions for token in tokens[position])
+
+
+class DateTerm:
+    """Challans dated within a range of ISO dates."""
+
+    def __init__(self, index, first, last, estimate, start, end):
+        self.index = index
+        self.first = first
+        self.last = last + "\uffff"
+        self.estimate = estimate
+        self.start = start
+        self.end = end
+
+    def ids(self):
+        return iter(sorted((challan_id for _, challan_id in self.index.dates[self.start:self.end]), reverse=True))
+
+    def contains(self, challan_id):
+        return self.first <= self.index.challan_dates.get(challan_id, "") <= self.last
+
+# Split a query into (field, value) terms; field is None for plain words
+def parse_query(query):
+    terms = []
+    for quoted_field, quoted_value, field, value, phrase, word in QUERY_PATTERN.findall(query):
+        if quoted_field:
+            terms.append((quoted_field.lower(), quoted_value))
+        elif field:
+            terms.append((field.lower(), value))
+        else:
+            terms.append((None, phrase or word))
+    return terms
+
+# Search index of the challan ledger, reading only rows added since the last call
+def load_search_index(path=None):
+    """If ledger rows were replaced since the index was built, it is built again."""
+    ledger_path = path or challan_ledger.LEDGER_FILE
+    index = _indexes.get(ledger_path) or ChallanSearchIndex()
+    connection = connect_ledger(ledger_path)
+    try:
+        count, last_id = connection.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM challans").fetchone()
+        replaced = replaced_count(connection)
+        if (count, last_id, replaced) != (index.count, index.last_id, index.replaced):
+            if replaced != index.replaced:
+                index = ChallanSearchIndex()
+                index.replaced = replaced
+            index.extend(connection)
+    finally:
+        connection.close()
+    _indexes[ledger_path] = index
+    return index
+
+# Ledger rows of the given challan ids, in the same order
+def challan_rows(ids, path=None):
+    """Returns dicts with counter, challan_number, date, company_name, transport_name, total_pieces, net_amount and file."""
+    if not ids:
+        return []
+    columns = ["id", "counter", "challan_number", "date", "company_name", "transport_name", "total_pieces", "net_amount", "file"]
+    connection = connect_ledger(path)
+    try:
+        rows = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for row in connection.execute(f"SELECT {', '.join(columns)} FROM challans WHERE id IN ({', '.join('?' * len(chunk))})", chunk):
+                rows[row[0]] = dict(zip(columns, row))
+    finally:
+        connection.close()
+    return [rows[challan_id] for challan_id in ids if challan_id in rows]
+
+# Search the challan ledger and return the matching challans, newest first
+def search_challans(query, limit=100, path=None):
+    return challan_rows(load_search_index(path).search(query, limit), path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search issued challans.")
+    parser.add_argument("query", help='e.g. customer:"XYZ FAB" hsn:5407 from:01.07.25 to:30.09.25')
+    parser.add_argument("--limit", type=int, default=50, help="most challans to show (default: 50)")
+    args = parser.parse_args()
+    ensure_ledger()
+    start = time.perf_counter()
+    index = load_search_index()
+    loaded = time.perf_counter()
+    ids = index.search(args.query, args.limit)
+    searched = time.perf_counter()
+    for row in challan_rows(ids):
+        print(f"{row['counter']!s:>6} {row['challan_number']!s:>8} {row['date']:10} {row['company_name']:25} {row['transport_name']:25} {row['net_amount']!s:>10}  {row['file']}")
+    print(f"{len(ids)} challans; index of {index.count} challans loaded in {(loaded - start) * 1000:.0f} ms, searched in {(searched - loaded) * 1000:.1f} ms")
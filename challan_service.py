@@ -0,0 +1,352 @@
+import argparse, asyncio, io, json, os, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from challan_ledger import challan_record, ensure_ledger, is_archive_reference, record_challan
+from challan_timing import challan_trace, span
+from Transport_Challan import (
+    CHALLAN_DIRECTORY, ITEM_ROWS, batch_spec_arguments, build_challan_workbook, company_store,
+    get_challan_template, get_next_counter, initialize_counter, item_catalog, read_archived_challan,
+    store_challan, transport_store, write_challan_streaming,
+)
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 1024 * 1024
+
+# Number of finished jobs kept for the latency figures in /metrics
+METRICS_WINDOW = 1000
+
+HTTP_REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Read the bytes of a stored challan, rebuilding archived ones in memory
+def challan_bytes(reference):
+    if not is_archive_reference(reference):
+        with open(reference, "rb") as file:
+            return file.read()
+    company_data, transport_data, arguments = read_archived_challan(reference)
+    buffer = io.BytesIO()
+    if len(arguments[3]) > ITEM_ROWS:
+        write_challan_streaming(buffer, company_data, transport_data, *arguments)
+    else:
+        build_challan_workbook(company_data, transport_data, *arguments).save(buffer)
+    return buffer.getvalue()
+
+# A JSON integer; bool is a subclass of int but true/false aren't numbers
+def is_json_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+# Check a challan spec against the master data and turn it into generate_challan arguments
+def validate_spec(spec, company_data, transport_data):
+    """Raise HTTPError(400) for anything the writer would fail on, before a counter is reserved."""
+    if not isinstance(spec, dict):
+        raise HTTPError(400, "expected a JSON object")
+    items = spec.get("items", [])
+    if not isinstance(items, list) or any(not isinstance(item, list) or len(item) != 4 for item in items):
+        raise HTTPError(400, "each item must be [item_name, hsn, pieces, amount]")
+    for field in ("company_name", "transport_name", "date", "challan_number", "contact_no", "No_of_Other_Party_Goods", "Amount_of_Other_Party_Goods"):
+        if field in spec and not isinstance(spec[field], str):
+            raise HTTPError(400, f"{field} must be a string, got {spec[field]!r}")
+    for line_no, item in enumerate(items, start=1):
+        if not isinstance(item[0], str) or not isinstance(item[1], str):
+            raise HTTPError(400, f"item {line_no} name and hsn must be strings")
+    numbers = [(f"item {line_no} {field}", item[index]) for line_no, item in enumerate(items, start=1) for field, index in (("pieces", 2), ("amount", 3))]
+    numbers += [(field, spec.get(field, 0)) for field in ("discount", "gst")]
+    for field, value in numbers:
+        if not is_json_int(value):
+            raise HTTPError(400, f"{field} must be an integer, got {value!r}")
+    try:
+        arguments = batch_spec_arguments(spec)
+    except KeyError as exc:
+        raise HTTPError(400, f"missing field {exc.args[0]!r}")
+    except (TypeError, ValueError) as exc:
+        raise HTTPError(400, str(exc))
+    if arguments[1] not in company_data:
+        raise HTTPError(400, f"unknown company {arguments[1]!r}")
+    if arguments[2] not in transport_data:
+        raise HTTPError(400, f"unknown transport {arguments[2]!r}")
+    return arguments
+
+
+class ChallanService:
+    """
+    Local HTTP/JSON front end to challan generation.
+
+    Requests are parsed on the asyncio loop and each challan is queued as a
+    job; `workers` consumers hand the jobs to a thread pool that reserves a
+    counter, writes the workbook (or archive line) and records it in the
+    ledger, exactly as generate_challan() does minus the viewer.
+
+    Endpoints:
+        POST /challans                 challan spec (batch format) -> {"counter", "file"}
+        POST /challans?format=xlsx     same, but answers with the workbook bytes
+        GET  /companies, /transports   master data
+        GET  /companies/<name>         one entry (likewise for transports)
+        PUT  /companies/<name>         add or replace an entry (likewise for transports)
+        GET  /metrics                  throughput, latency and queue figures
+        GET  /health
+    """
+
+    def __init__(self, workers=4, directory=CHALLAN_DIRECTORY, storage=None, queue_size=100):
+        self.workers = workers
+        self.directory = directory
+        self.storage = storage
+        self.queue_size = queue_size
+        self.stores = {"companies": company_store, "transports": transport_store}
+        self.server = None
+        self.queue = None
+        self.executor = None
+        self.consumers = []
+        self.started = None
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy = 0
+        self.finished = deque(maxlen=METRICS_WINDOW)  # (finish time, queue wait, run time)
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """Start listening and return the port actually bound (useful with port=0)."""
+        os.makedirs(self.directory, exist_ok=True)
+        initialize_counter()
+        self.queue = asyncio.Queue(self.queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="challan")
+        await asyncio.get_running_loop().run_in_executor(self.executor, get_challan_template)
+        self.consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        self.started = time.perf_counter()
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop accepting connections, let queued jobs finish and shut the pool down."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.queue is not None:
+            await self.queue.join()
+        for consumer in self.consumers:
+            consumer.cancel()
+        await asyncio.gather(*self.consumers, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+    # Jobs
+
+    def _generate(self, arguments, want_bytes):
+        with challan_trace("service") as trace:
+            with span("master data"):
+                company_data = company_store.get()
+                transport_data = transport_store.get()
+            with span("counter"):
+                counter = get_next_counter()
+            trace.info.update(counter=counter, challan_number=str(arguments[7]), items=len(arguments[3]))
+            file = store_challan(counter, self.directory, company_data, transport_data, *arguments, storage=self.storage)
+            with span("ledger"):
+                record_challan(challan_record(counter, file, *arguments))
+            with span("catalog"):
+                item_catalog.record([(arguments[2], arguments[3])])
+            return counter, file, challan_bytes(file) if want_bytes else None
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            arguments, want_bytes, queued, future = await self.queue.get()
+            started = time.perf_counter()
+            self.busy += 1
+            try:
+                result = await loop.run_in_executor(self.executor, self._generate, arguments, want_bytes)
+            except Exception as exc:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                self.completed += 1
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.busy -= 1
+                finished = time.perf_counter()
+                self.finished.append((finished, started - queued, finished - started))
+                self.queue.task_done()
+
+    async def submit(self, arguments, want_bytes=False):
+        """Queue one challan and wait for (counter, file, bytes or None)."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((arguments, want_bytes, time.perf_counter(), future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise HTTPError(503, "job queue is full, try again later")
+        return await future
+
+    def metrics(self):
+        """Throughput and latency figures; latencies are in milliseconds over the last METRICS_WINDOW jobs."""
+        now = time.perf_counter()
+        uptime = now - self.started if self.started else 0.0
+
+        def percentile(values, fraction):
+            if not values:
+                return None
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(fraction * len(values)))] * 1000, 2)
+
+        waits = [wait for _, wait, _ in self.finished]
+        totals = [wait + run for _, wait, run in self.finished]
+        runs = [run for _, _, run in self.finished]
+        last_minute = sum(1 for finished, _, _ in self.finished if now - finished <= 60)
+        return {
+            "uptime_s": round(uptime, 3),
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "busy": self.busy,
+            "throughput_per_s": round(self.completed / uptime, 2) if uptime else 0.0,
+            "throughput_last_minute_per_s": round(last_minute / min(uptime, 60), 2) if uptime else 0.0,
+            "latency_ms": {"p50": percentile(totals, 0.5), "p95": percentile(totals, 0.95), "p99": percentile(totals, 0.99), "max": percentile(totals, 1.0)},
+            "queue_wait_ms": {"p50": percentile(waits, 0.5), "p95": percentile(waits, 0.95)},
+            "run_ms": {"p50": percentile(runs, 0.5), "p95": percentile(runs, 0.95)},
+        }
+
+    # HTTP
+
+    async def _route(self, method, path, query, body):
+        parts = [unquote(part) for part in path.strip("/").split("/") if part]
+        if parts == ["health"] and method == "GET":
+            return 200, {"status": "ok"}
+        if parts == ["metrics"] and method == "GET":
+            return 200, self.metrics()
+
+        if parts == ["challans"]:
+            if method != "POST":
+                raise HTTPError(405, "use POST")
+            arguments = validate_spec(self._json(body), company_store.get(), transport_store.get())
+            want_bytes = query.get("format", [""])[0] == "xlsx"
+            counter, file, data = await self.submit(arguments, want_bytes)
+            if want_bytes:
+                return 201, data
+            return 201, {"counter": counter, "file": file}
+
+        if parts and parts[0] in self.stores and len(parts) <= 2:
+            store = self.stores[parts[0]]
+            if len(parts) == 1:
+                if method != "GET":
+                    raise HTTPError(405, "use GET")
+                return 200, store.get()
+            name = parts[1].upper()
+            if method == "GET":
+                if name not in store.get():
+                    raise HTTPError(404, f"{name!r} not found")
+                return 200, store.get()[name]
+            if method == "PUT":
+                details = self._json(body)
+                if not isinstance(details, dict):
+                    raise HTTPError(400, "expected a JSON object")
+                await asyncio.get_running_loop().run_in_executor(self.executor, store.set, name, details)
+                return 200, details
+            raise HTTPError(405, "use GET or PUT")
+
+        raise HTTPError(404, f"no such endpoint {path!r}")
+
+    def _json(self, body):
+        try:
+            return json.loads(body or b"null")
+        except ValueError as exc:
+            raise HTTPError(400, f"invalid JSON: {exc}")
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(413, f"request body is larger than {MAX_BODY_SIZE} bytes")
+        body = await reader.readexactly(length) if length else b""
+        keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+        return method.upper(), target, body, keep_alive
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, body, keep_alive = request
+                    url = urlsplit(target)
+                    status, payload = await self._route(method, url.path, parse_qs(url.query), body)
+                except HTTPError as exc:
+                    status, payload = exc.status, {"error": str(exc)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as exc:
+                    status, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+                if isinstance(payload, bytes):
+                    content_type = XLSX_CONTENT_TYPE
+                else:
+                    content_type = "application/json"
+                    payload = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+# Run the service until interrupted
+async def serve(host, port, workers, directory, storage):
+    ensure_ledger(directory)
+    service = ChallanService(workers=workers, directory=directory, storage=storage)
+    port = await service.start(host, port)
+    print(f"Challan service listening on http://{host}:{port} with {workers} workers")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve challan generation over a local HTTP/JSON API.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument("--workers", type=int, default=4, help="number of challan writer threads (default: 4)")
+    parser.add_argument("--output", default=CHALLAN_DIRECTORY, help="directory to save challans in")
+    parser.add_argument("--storage", choices=["files", "monthly"], help="one .xlsx per challan or per-month archives")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.output, args.storage))
+    except KeyboardInterrupt:
+        pass
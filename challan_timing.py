@@ -0,0 +1,179 @@
+import argparse, json, os, threading, time
+from collections import deque
+from contextlib import contextmanager
+
+# Rolling log of per-challan stage timings, one JSON line per challan
+TIMING_LOG_FILE = r"Data\challan_timing.jsonl"
+
+# Once the log is bigger than this it is moved to TIMING_LOG_FILE + ".1"
+TIMING_LOG_MAX_BYTES = 1024 * 1024
+
+# Set CHALLAN_PROFILE to a directory (or 1 for "profiles") to save a cProfile
+# capture of every challan there, for `python -m pstats <file>`
+PROFILE_DIRECTORY = os.environ.get("CHALLAN_PROFILE", "")
+if PROFILE_DIRECTORY == "1":
+    PROFILE_DIRECTORY = "profiles"
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+# Held by the one challan being profiled. Since Python 3.12 only one cProfile
+# can be enabled in the whole process, so challans traced on other threads at
+# the same time are timed but not profiled.
+_profile_lock = threading.Lock()
+
+
+class ChallanTrace:
+    """Stage timings of one challan, in milliseconds, in the order the stages ran."""
+
+    def __init__(self, label=""):
+        self.label = label
+        self.stages = {}
+        self.info = {}
+        self.started = time.perf_counter()
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds * 1000
+
+    @contextmanager
+    def activate(self):
+        """Make this the trace that span() records into on the current thread, without finishing it."""
+        previous = getattr(_local, "trace", None)
+        _local.trace = self
+        try:
+            yield self
+        finally:
+            _local.trace = previous
+
+    def entry(self):
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "label": self.label,
+            **self.info,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages": {stage: round(ms, 3) for stage, ms in self.stages.items()},
+        }
+
+# Time one stage of the challan being traced on this thread
+@contextmanager
+def span(stage):
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, time.perf_counter() - start)
+
+# Trace one challan from start to finish
+@contextmanager
+def challan_trace(label="", trace=None):
+    """
+    Collect the span() timings of one challan and append them to the timing
+    log when it is done. Inside a challan_trace() that is already running on
+    this thread, the spans simply join the outer trace. Pass `trace` to carry
+    on a ChallanTrace begun elsewhere (e.g. on the GUI thread).
+
+    With CHALLAN_PROFILE set the whole challan also runs under cProfile,
+    unless another challan (or another profiler) is being profiled already.
+    """
+    active = getattr(_local, "trace", None)
+    if active is not None and trace is None:
+        yield active
+        return
+
+    trace = trace or ChallanTrace(label)
+    trace.label = trace.label or label
+    profiler = None
+    if PROFILE_DIRECTORY and _profile_lock.acquire(blocking=False):
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # "Another profiling tool is already active"
+            profiler = None
+            _profile_lock.release()
+    try:
+        with trace.activate():
+            yield trace
+    finally:
+        entry = trace.entry()
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+            entry["profile"] = save_profile(profiler, trace)
+        write_timing_entry(entry)
+
+# Save a cProfile capture next to the others
+def save_profile(profiler, trace):
+    os.makedirs(PROFILE_DIRECTORY, exist_ok=True)
+    name = f"challan_{trace.info.get('counter', 'x')}_{time.strftime('%Y%m%d_%H%M%S')}_{threading.get_ident()}.prof"
+    path = os.path.join(PROFILE_DIRECTORY, name)
+    profiler.dump_stats(path)
+    return path
+
+# Append one entry to the rolling timing log
+def write_timing_entry(entry, path=None):
+    path = path or TIMING_LOG_FILE
+    line = json.dumps(entry) + "\n"
+    with _log_lock:
+        try:
+            if os.path.getsize(path) > TIMING_LOG_MAX_BYTES:
+                os.replace(path, path + ".1")
+        except OSError:
+            pass
+        try:
+            with open(path, "a") as file:
+                file.write(line)
+        except OSError:
+            pass  # timings are only diagnostics
+
+# Read the most recent entries of the timing log, oldest first
+def read_timing_log(limit=500, path=None):
+    path = path or TIMING_LOG_FILE
+    entries = deque(maxlen=limit)
+    for file_path in (path + ".1", path):
+        try:
+            with open(file_path, "r") as file:
+                for line in file:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    return list(entries)
+
+# p50/p95/max of every stage over a list of log entries
+def stage_percentiles(entries):
+    """
+    Return [(stage, count, p50_ms, p95_ms, max_ms)] for every stage in the
+    order stages first appear, followed by the whole challan as "total".
+    """
+    samples = {}
+    for entry in entries:
+        for stage, ms in entry.get("stages", {}).items():
+            samples.setdefault(stage, []).append(ms)
+    if entries:
+        samples["total"] = [entry.get("total_ms", 0.0) for entry in entries]
+
+    rows = []
+    for stage, values in samples.items():
+        values = sorted(values)
+        def at(fraction):
+            return values[min(len(values) - 1, int(fraction * len(values)))]
+        rows.append((stage, len(values), at(0.5), at(0.95), values[-1]))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show p50/p95 stage timings from the challan timing log.")
+    parser.add_argument("--last", type=int, default=500, help="number of recent challans to look at (default: 500)")
+    args = parser.parse_args()
+    entries = read_timing_log(args.last)
+    print(f"{len(entries)} challans in {TIMING_LOG_FILE}")
+    print(f"{'stage':16} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for stage, count, p50, p95, worst in stage_percentiles(entries):
+        print(f"{stage:16} {count:6d} {p50:10.2f} {p95:10.2f} {worst:10.2f}")
@@ -0,0 +1,98 @@
+import re
+from bisect import bisect_left, insort
+
+# Splits a name into the words a search can start at
+WORD_PATTERN = re.compile(r"[A-Z0-9]+")
+
+# Most word-index entries one search looks at, which keeps a query made of
+# very common prefixes (like "A B") fast at the cost of missing some matches
+SCAN_LIMIT = 200
+
+# Normalise a name or query: upper case, single spaces
+def normalize_name(text):
+    return " ".join(str(text).upper().split())
+
+
+class NameIndex:
+    """
+    Type-ahead search over supplier or customer names.
+
+    Names are kept in a sorted list, and so are the (word, name) pairs of
+    every word in them, so prefix lookups are a bisect plus a walk over the
+    hits. add() and remove() keep both lists sorted in place instead of
+    rebuilding them.
+
+    search() returns names starting with the query first, then names in
+    which every word of the query starts a word, in any order ("TEX" and
+    "TEX AB" both find "ABC TEXTILES"). Each query walks only the hits of
+    its rarest word, so it costs O(log n) plus the number of hits looked at.
+    """
+
+    def __init__(self, names=()):
+        self.keys = sorted({normalize_name(name) for name in names if normalize_name(name)})
+        self.name_words = {key: WORD_PATTERN.findall(key) for key in self.keys}
+        self.words = sorted((word, key) for key, words in self.name_words.items() for word in words)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, name):
+        key = normalize_name(name)
+        i = bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def add(self, name):
+        key = normalize_name(name)
+        if not key or key in self:
+            return
+        insort(self.keys, key)
+        self.name_words[key] = WORD_PATTERN.findall(key)
+        for word in self.name_words[key]:
+            insort(self.words, (word, key))
+
+    def remove(self, name):
+        key = normalize_name(name)
+        if key not in self:
+            return
+        del self.keys[bisect_left(self.keys, key)]
+        for word in self.name_words.pop(key):
+            del self.words[bisect_left(self.words, (word, key))]
+
+    def search(self, text, limit=10):
+        """Return up to `limit` names matching `text`, best matches first."""
+        query = normalize_name(text)
+        if not query:
+            return self.keys[:limit]
+
+        results = []
+        seen = set()
+
+        def take(key):
+            if key not in seen:
+                seen.add(key)
+                results.append(key)
+            return len(results) >= limit
+
+        i = bisect_left(self.keys, query)
+        while i < len(self.keys) and self.keys[i].startswith(query):
+            if take(self.keys[i]):
+                return results
+            i += 1
+
+        # Every query word must start a word of the name, in any order. Walk
+        # the hits of the query word with the fewest of them and check the rest.
+        query_words = WORD_PATTERN.findall(query)
+        if not query_words:
+            return results
+        ranges = [(bisect_left(self.words, (word,)), bisect_left(self.words, (word + "\uffff",))) for word in query_words]
+        rarest = min(range(len(ranges)), key=lambda n: ranges[n][1] - ranges[n][0])
+        others = query_words[:rarest] + query_words[rarest + 1:]
+        start, end = ranges[rarest]
+        for _, key in self.words[start:min(end, start + SCAN_LIMIT)]:
+            if key in seen:
+                continue
+            name_words = self.name_words[key]
+            if all(any(name_word.startswith(word) for name_word in name_words) for word in others):
+                if take(key):
+                    break
+        return results
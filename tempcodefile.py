@@ -1,18 +1,23 @@
+import time
+_startup_start = time.perf_counter()
+
 import customtkinter as ctk
 from tkinter import messagebox, simpledialog
 from tkinter import ttk
 import tkinter as tk
 import webbrowser
+import queue, threading
 import sys, os
-from datetime import datetime
 
 
 # Import your business logic functions and constants.
-from Transport_Challan import generate_challan, load_data_file, save_data_file, COMPANY_DATA_FILE, TRANSPORT_DATA_FILE
+from Transport_Challan import generate_challan, company_store, transport_store, item_catalog, open_file, reprint_challan
+from challan_draft import DraftJournal
+from challan_ledger import ensure_ledger, is_archive_reference
+from challan_search import challan_rows, load_search_index
+from challan_timing import ChallanTrace, PROFILE_DIRECTORY, TIMING_LOG_FILE, challan_trace, read_timing_log, span, stage_percentiles
 
-# Import Matplotlib modules for graphing
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+# Matplotlib is imported by StatisticsPage the first time it is opened
 
 # -------------------- colors ------------------------------
 white = '#FFFFFF' # for values of entry eg supplier name, customer name contact no and so on
@@ -32,14 +37,147 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-def create_dropdown(parent, row, column, text, names):
-    """Creates a label and dropdown (OptionMenu) in the given parent using grid."""
-    sorted_names = sorted(names)
+# Number of matches shown under a name picker
+PICKER_MATCHES = 8
+
+class NamePicker(ctk.CTkFrame):
+    """
+    Entry for a supplier or customer name with a type-ahead list of matches.
+
+    Every keystroke asks `store.search()` for the best matches, which comes
+    from the store's name index, so the list stays quick with thousands of
+    names. Up/Down move through the list, Enter or a click picks a name and
+    Escape closes the list. get() and set() work like CTkOptionMenu's.
+    """
+
+    def __init__(self, parent, store, placeholder, width=400):
+        super().__init__(parent, fg_color="transparent")
+        self.store = store
+        self.entry = ctk.CTkEntry(self, width=width, font=("Arial", 16), placeholder_text=placeholder)
+        self.entry.pack(fill="x")
+        self.listbox = tk.Listbox(
+            self.winfo_toplevel(), height=PICKER_MATCHES, font=("Arial", 14), activestyle="none",
+            bg=bluish_gray, fg=white, selectbackground=cyan, selectforeground=bluish_gray,
+            highlightthickness=0, borderwidth=0,
+        )
+        self.entry.bind("<KeyRelease>", self.on_key)
+        self.entry.bind("<Down>", lambda event: self.move_selection(1))
+        self.entry.bind("<Up>", lambda event: self.move_selection(-1))
+        self.entry.bind("<Return>", lambda event: self.choose())
+        self.entry.bind("<Escape>", lambda event: self.hide_matches())
+        self.entry.bind("<FocusOut>", lambda event: self.after(150, self.hide_unless_focused))
+        self.entry.bind("<Tab>", focus_next_widget)
+        self.listbox.bind("<ButtonRelease-1>", lambda event: self.choose())
+
+    def on_key(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        self.show_matches()
+
+    def matches(self, text):
+        return self.store.search(text, PICKER_MATCHES)
+
+    def show_matches(self):
+        matches = self.matches(self.entry.get())
+        self.listbox.delete(0, "end")
+        if not matches:
+            self.hide_matches()
+            return
+        self.listbox.insert("end", *matches)
+        self.listbox.configure(height=len(matches))
+        self.listbox.selection_set(0)
+        self.listbox.place(in_=self.entry, x=0, rely=1, relwidth=1)
+        self.listbox.lift()
+
+    def hide_matches(self):
+        self.listbox.place_forget()
+
+    def hide_unless_focused(self):
+        # A click on the list takes the focus from the entry; keep the list open for it
+        if self.focus_get() is not self.listbox:
+            self.hide_matches()
+
+    def move_selection(self, step):
+        if not self.listbox.winfo_ismapped():
+            self.show_matches()
+            return "break"
+        selection = self.listbox.curselection()
+        index = max(0, min(self.listbox.size() - 1, (selection[0] if selection else -1) + step))
+        self.listbox.selection_clear(0, "end")
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        return "break"
+
+    def choose(self):
+        selection = self.listbox.curselection()
+        if self.listbox.winfo_ismapped() and selection:
+            self.set(self.listbox.get(selection[0]))
+        self.hide_matches()
+        self.entry.focus_set()
+        return "break"
+
+    def get(self):
+        return self.entry.get()
+
+    def set(self, value):
+        self.entry.delete(0, "end")
+        if value:
+            self.entry.insert(0, value)
+
+class ItemPicker(NamePicker):
+    """
+    NamePicker over the item catalog. The items recently sent to the
+    customer returned by `customer()` are listed first, and picking an item
+    (or pressing Enter on a known one) passes its catalog details, with
+    the HSN code and last amount, to `on_choose(details)`.
+
+    Recent items are only used once `customer()` is a name in `customers`,
+    so partly typed names are never looked up, and they are read from the
+    ledger on a background thread; until they are loaded the list has none.
+    """
+
+    def __init__(self, parent, catalog, placeholder, customer, customers, on_choose, width=400):
+        super().__init__(parent, catalog, placeholder, width)
+        self.customer = customer
+        self.customers = customers
+        self.on_choose = on_choose
+        self.loading = set()
+        self.entry.bind("<FocusIn>", lambda event: self.known_customer())
+
+    def known_customer(self):
+        # The customer if it is a known name, starting to load its recent items if they aren't yet
+        customer = self.customer().strip()
+        if not customer or customer not in self.customers.get():
+            return None
+        if self.store.recent_items(customer) is None and customer not in self.loading:
+            self.loading.add(customer)
+            threading.Thread(target=self.load_recent, args=(customer,), daemon=True).start()
+        return customer
+
+    def load_recent(self, customer):
+        try:
+            self.store.load_recent(customer)
+        finally:
+            self.loading.discard(customer)
+
+    def matches(self, text):
+        return self.store.search(text, PICKER_MATCHES, self.known_customer())
+
+    def choose(self):
+        result = super().choose()
+        details = self.store.lookup(self.get())
+        if details is not None:
+            self.set(details["name"])
+            self.on_choose(details)
+        return result
+
+def create_name_picker(parent, row, column, text, store, placeholder):
+    """Creates a label and a type-ahead NamePicker in the given parent using grid."""
     label = ctk.CTkLabel(parent, text=text, font=("Arial", 16))
     label.grid(row=row, column=column, padx=10, pady=5, sticky="w")
-    dropdown = ctk.CTkOptionMenu(parent, values=sorted_names, width=400, font=("Arial", 16))
-    dropdown.grid(row=row, column=column + 1, padx=10, pady=5)
-    return dropdown
+    picker = NamePicker(parent, store, placeholder)
+    picker.grid(row=row, column=column + 1, padx=10, pady=5)
+    return picker
 
 def create_label_and_entry(parent, text, row, column, width=600):
     """Creates a label and an entry (Textbox) in the given parent using grid."""
@@ -55,56 +193,86 @@ def focus_next_widget(event):
     event.widget.tk_focusNext().focus_set()
     return "break"
 
-def get_monthly_challan_counts(directory="generated_challans"):
+def show_toast(parent, text, duration=3000):
+    """Shows a small message in the bottom-right corner that disappears by itself."""
+    toast = ctk.CTkLabel(parent, text=text, font=("Arial", 16), fg_color=cyan, text_color=bluish_gray, corner_radius=8)
+    toast.place(relx=0.98, rely=0.98, anchor="se")
+    toast.after(duration, toast.destroy)
+
+class ChallanWorker:
     """
-    Scans the specified directory for challan files and counts how many were
-    generated in each month. Assumes file names are in the format:
-    
-    transport_challan_{company}_{transport}_{d}_{m}_{y}_{counter}.xlsx
-    
-    where the date is in the form "%d_%m_%y" (e.g., "12_12_25").
-    
-    Returns a dictionary with month abbreviations (e.g., "Dec") as keys and counts as values.
+    Runs generate_challan() jobs one at a time on a background thread so the
+    Tk event loop never blocks on formatting, saving or opening the workbook.
+
+    Jobs are written in the order they were submitted. `on_done(job, error)`
+    is called on the Tk thread through after() when each job finishes, with
+    error set to the exception if it failed. A job's ChallanTrace, if given,
+    also gets the time it waited in the queue.
     """
-    monthly_counts = {}
-    if not os.path.isdir(directory):
-        return monthly_counts  # Return an empty dict if the directory doesn't exist
-    
-    for file in os.listdir(directory):
-        if file.startswith("transport_challan") and file.endswith(".xlsx"):
-            # Split the filename by underscores
-            parts = file.split("_")
-            # For a file name like:
-            # "transport_challan_ABC_Corp_XYZ_Logistics_12_12_25_1.xlsx"
-            # the parts will be:
-            # parts[0] = "transport"
-            # parts[1] = "challan"
-            # parts[2...n-5] = company and transport name (could be multiple parts)
-            # parts[-4] = day, parts[-3] = month, parts[-2] = year, parts[-1] = counter + ".xlsx"
-            if len(parts) >= 7:
-                # Combine the three parts for the date
-                date_str = f"{parts[-4]}_{parts[-3]}_{parts[-2]}"
-                try:
-                    # Parse the date using the format "%d_%m_%y"
-                    dt = datetime.strptime(date_str, "%d_%m_%y")
-                    # Use abbreviated month name (e.g., "Dec")
-                    month = dt.strftime("%b")
-                    monthly_counts[month] = monthly_counts.get(month, 0) + 1
-                except ValueError:
-                    # Skip this file if the date format is not as expected
-                    continue
-    return monthly_counts
-
-def load_names():
-    """Load supplier and customer names from data files."""
-    company_data = load_data_file(COMPANY_DATA_FILE)
-    transport_data = load_data_file(TRANSPORT_DATA_FILE)
-    company_names = list(company_data.keys())
-    transport_names = list(transport_data.keys())
-    return company_names, transport_names
-
-# Load names globally
-supplier_names, customer_names = load_names()
+
+    def __init__(self, widget, on_done):
+        self.widget = widget
+        self.on_done = on_done
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, job, trace=None):
+        self.pending += 1
+        self.jobs.put((job, trace, time.perf_counter()))
+        if self.pending == 1:
+            self.widget.after(100, self._poll)
+
+    def wait(self):
+        """Blocks until every submitted job has been written, then reports them to on_done."""
+        self.jobs.join()
+        self._poll()
+
+    def _run(self):
+        while True:
+            job, trace, queued = self.jobs.get()
+            try:
+                if trace is not None:
+                    trace.add("queue wait", time.perf_counter() - queued)
+                with challan_trace("gui", trace):
+                    generate_challan(**job)
+                self.results.put((job, None))
+            except Exception as exc:
+                self.results.put((job, exc))
+            finally:
+                self.jobs.task_done()
+
+    def _poll(self):
+        while True:
+            try:
+                job, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            self.on_done(job, error)
+        if self.pending:
+            self.widget.after(100, self._poll)
+
+# -------------------- Startup timing --------------------
+
+# Pass --startup-timing (or set TRANSPORT_CHALLAN_STARTUP_TIMING=1) to print
+# how long each startup step took once the window is ready.
+STARTUP_TIMING = "--startup-timing" in sys.argv or bool(os.environ.get("TRANSPORT_CHALLAN_STARTUP_TIMING"))
+startup_marks = []
+
+def mark_startup(label):
+    """Records the time since the process started importing this module."""
+    startup_marks.append((label, time.perf_counter() - _startup_start))
+
+def print_startup_report():
+    print("Startup timing (seconds since start of import):")
+    previous = 0.0
+    for label, elapsed in startup_marks:
+        print(f"  {elapsed:7.3f}  (+{elapsed - previous:6.3f})  {label}")
+        previous = elapsed
+
+mark_startup("imports done")
 
 # Set appearance and color theme
 ctk.set_appearance_mode("system")
@@ -132,29 +300,50 @@ class MainApp(ctk.CTk):
         self.main_frame.grid_rowconfigure(0, weight=1)
         self.main_frame.grid_columnconfigure(0, weight=2)
         
-        # Create pages (each is a CTkFrame)
-        self.pages = {
-            "home": HomePage(self.main_frame),
-            "add_supplier": AddSupplierPage(self.main_frame),
-            "add_customer": AddCustomerPage(self.main_frame),
-            "statistics": StatisticsPage(self.main_frame),
-            "about": AboutPage(self.main_frame)
+        # Pages (each is a CTkFrame) are built the first time they are shown
+        self.page_classes = {
+            "home": HomePage,
+            "add_supplier": AddSupplierPage,
+            "add_customer": AddCustomerPage,
+            "statistics": StatisticsPage,
+            "search": SearchPage,
+            "diagnostics": DiagnosticsPage,
+            "about": AboutPage
         }
-        for page in self.pages.values():
-            page.grid(row=0, column=0, sticky="nsew")
+        self.pages = {}
         
         # Create sidebar navigation buttons
         self.create_sidebar_button("🏠 Home", "home", white)
         self.create_sidebar_button("📦 Add Supplier", "add_supplier", '#FCB859')
         self.create_sidebar_button("👤 Add Customer", "add_customer", '#F2C8ED')
         self.create_sidebar_button("📊 Statistics", "statistics", '#A9DFD8')
+        self.create_sidebar_button("🔍 Search", "search", white)
+        self.create_sidebar_button("⏱ Diagnostics", "diagnostics", grey)
         self.create_sidebar_button("About", "about", white)
         
         # Show Home page by default
-        self.pages["home"].tkraise()
+        self.show_page("home")
+        
+        # Let challans that are still being written finish before closing
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+    
+    def on_close(self):
+        home = self.pages["home"]
+        home.worker.wait()
+        home.save_draft_fields()
+        home.draft.close()
+        self.destroy()
+    
+    def show_page(self, page_name):
+        page = self.pages.get(page_name)
+        if page is None:
+            page = self.pages[page_name] = self.page_classes[page_name](self.main_frame)
+            page.grid(row=0, column=0, sticky="nsew")
+            mark_startup(f"{page_name} page built")
+        page.tkraise()
     
     def create_sidebar_button(self, text, page_name, text_color):
-        btn = ctk.CTkButton(self.sidebar, text=text,fg_color=deep_slate, hover_color=bluish_gray,text_color=text_color, command=lambda: self.pages[page_name].tkraise())
+        btn = ctk.CTkButton(self.sidebar, text=text,fg_color=deep_slate, hover_color=bluish_gray,text_color=text_color, command=lambda: self.show_page(page_name))
         btn.pack(pady=10, padx=10, fill="x")
 
 # -------------------- Page Classes --------------------
@@ -166,26 +355,29 @@ class HomePage(ctk.CTkFrame):
         title = ctk.CTkLabel(self, text="💳 Generate Challan", font=("Arial", 24))
         title.grid(row=0, column=0, columnspan=2, pady=20)
         
-        # Dropdowns for supplier and customer names
-        self.company_text = create_dropdown(self, 1, 0, "Select Supplier Name:", supplier_names)
-        self.transport_text = create_dropdown(self, 2, 0, "Select Customer Name:", customer_names)
+        # Type-ahead pickers for supplier and customer names
+        self.company_text = create_name_picker(self, 1, 0, "Select Supplier Name:", company_store, "Select Company")
+        self.transport_text = create_name_picker(self, 2, 0, "Select Customer Name:", transport_store, "Select transport")
+        # Build the name indexes once the window is up rather than on the first keystroke
+        self.after_idle(self.index_master_data)
         
         # Entry fields for contact, challan number, and date
         self.contact_no_text = create_label_and_entry(self, "Contact No:", 3, 0)
         self.challan_number_text = create_label_and_entry(self, "Challan Number:", 4, 0)
         self.date_text = create_label_and_entry(self, "Date (DD.MM.YY):", 5, 0)
-        self.company_text.set("Select Company")
-        self.transport_text.set("Select transport")
         
         # Item entry section in its own frame
         self.item_frame = ctk.CTkFrame(self, fg_color=deep_slate)
         self.item_frame.grid(row=6, column=0, columnspan=2, padx=5, pady=10, sticky="nsew")
         
-        # Item detail fields
-        self.item_name_text = create_label_and_entry(self.item_frame, "Item Name:", 0, 0, width=400)
-        self.item_name_text.insert('1.0', 'saree')
+        # Item detail fields; the item name autocompletes from the item catalog and fills in the rest
+        item_label = ctk.CTkLabel(self.item_frame, text="Item Name:", font=("Arial", 16))
+        item_label.grid(row=0, column=0, padx=5, pady=5, sticky="nsew")
+        self.item_name_text = ItemPicker(self.item_frame, item_catalog, "Item name", lambda: self.transport_text.get(), transport_store, self.fill_item)
+        self.item_name_text.grid(row=0, column=1, padx=5, pady=5, sticky="nsew")
+        # The catalog can hold 100k items, so its index is built off the Tk thread
+        threading.Thread(target=item_catalog.index, daemon=True).start()
         self.hsn_text = create_label_and_entry(self.item_frame, "HSN Code:", 0, 2, width=200)
-        self.hsn_text.insert('1.0', '5407')
         self.pieces_text = create_label_and_entry(self.item_frame, "Pieces:", 0, 4, width=100)
         self.amount_text = create_label_and_entry(self.item_frame, "Amount:", 0, 6, width=100)
         self.discount_text = create_label_and_entry(self.item_frame, "Discount:", 5, 0, width=200)
@@ -216,14 +408,149 @@ class HomePage(ctk.CTkFrame):
         # Generate Challan Button
         self.generate_button = ctk.CTkButton(self, text="Generate Challan", command=self.submit_data)
         self.generate_button.place(relx=0.5, rely=0.95, anchor='center')
+        
+        # Progress shown while challans are written in the background
+        self.progress_label = ctk.CTkLabel(self, text="", font=("Arial", 14))
+        self.progress_bar = ctk.CTkProgressBar(self, mode="indeterminate", width=200)
+        self.worker = ChallanWorker(self, self.challan_done)
+        
+        # Autosave of the form to the draft journal, restored after a crash
+        self.draft_fields = {
+            "company": self.company_text, "transport": self.transport_text,
+            "contact_no": self.contact_no_text, "challan_number": self.challan_number_text,
+            "date": self.date_text, "item_name": self.item_name_text, "hsn": self.hsn_text,
+            "pieces": self.pieces_text, "amount": self.amount_text,
+            "discount": self.discount_text, "gst": self.gst_text,
+            "no_of_other_goods": self.no_of_other_goods, "amount_of_other_goods": self.amount_of_other_goods,
+        }
+        for widget in self.draft_fields.values():
+            entry = widget.entry if isinstance(widget, NamePicker) else widget
+            entry.bind("<KeyRelease>", self.schedule_draft_save, add=True)
+            entry.bind("<FocusOut>", self.schedule_draft_save, add=True)
+        self.draft_save_pending = False
+        self.saved_fields = None
+        # Journal job number of each challan handed to the worker, by id() of its job
+        self.job_drafts = {}
+        self.draft = DraftJournal()
+        fields, items, jobs = self.draft.load()
+        if jobs or items or any(value for name, value in fields.items() if name not in ("item_name", "hsn")):
+            self.after_idle(lambda: self.offer_draft(fields, items, jobs))
+    
+    def index_master_data(self):
+        try:
+            company_store.index()
+            transport_store.index()
+        except ValueError as exc:
+            # A broken supplier or customer file is not migrated, so nothing in it is lost
+            messagebox.showerror("Error", f"The supplier and customer lists could not be loaded:\n{exc}")
+    
+    def form_fields(self):
+        return {
+            name: widget.get() if isinstance(widget, NamePicker) else widget.get("1.0", "end-1c")
+            for name, widget in self.draft_fields.items()
+        }
+    
+    def schedule_draft_save(self, event=None):
+        # A keystroke only sets a flag; the fields are read once per burst of typing
+        if not self.draft_save_pending:
+            self.draft_save_pending = True
+            self.after(300, self.save_draft_fields)
+    
+    def save_draft_fields(self):
+        self.draft_save_pending = False
+        fields = self.form_fields()
+        if fields != self.saved_fields:
+            self.saved_fields = fields
+            self.draft.append({"fields": fields})
+    
+    def compact_draft(self):
+        # Start the journal again from the form as it is now, keeping the challans still pending
+        self.draft.reset()
+        self.saved_fields = None
+        self.save_draft_fields()
+        for item in self.items:
+            self.draft.append({"item": item})
+    
+    def offer_draft(self, fields, items, jobs):
+        # Submitted challans that may not have been written first, then the form as it was left
+        drafts = list(jobs)
+        if items or any(value for name, value in fields.items() if name not in ("item_name", "hsn")):
+            drafts.append((None, fields, items))
+        for position, (job, draft_fields, draft_items) in enumerate(drafts):
+            if job is None:
+                question = f"Restore the unfinished challan ({len(draft_items)} item(s)) from last time?"
+            else:
+                question = (f"Challan {draft_fields.get('challan_number', '')} ({len(draft_items)} item(s)) was submitted "
+                            "but may not have been written. Restore it?")
+            if messagebox.askyesno("Unfinished Challan", question):
+                self.restore_form(draft_fields, draft_items)
+                if job is not None:
+                    self.draft.finish(job)
+                # The form holds one challan; any others are offered again at the next start
+                for later_job, later_fields, later_items in drafts[position + 1:]:
+                    if later_job is None:
+                        self.draft.submit(later_fields, later_items)
+                self.compact_draft()
+                return
+            if job is not None:
+                self.draft.finish(job)
+        self.draft.reset()
+    
+    def restore_form(self, fields, items):
+        for name, value in fields.items():
+            widget = self.draft_fields.get(name)
+            if isinstance(widget, NamePicker):
+                widget.set(value)
+            elif widget is not None:
+                widget.delete("1.0", "end")
+                widget.insert("1.0", value)
+        for row in self.tree.get_children():
+            self.tree.delete(row)
+        self.items = list(items)
+        for item in items:
+            self.tree.insert("", "end", values=item)
+    
+    def update_progress(self):
+        if self.worker.pending:
+            self.progress_label.configure(text=f"Writing {self.worker.pending} challan(s)...")
+            self.progress_label.place(relx=0.5, rely=0.86, anchor='center')
+            self.progress_bar.place(relx=0.5, rely=0.9, anchor='center')
+            self.progress_bar.start()
+        else:
+            self.progress_bar.stop()
+            self.progress_bar.place_forget()
+            self.progress_label.place_forget()
+    
+    def challan_done(self, job, error):
+        self.update_progress()
+        draft_job = self.job_drafts.pop(id(job), None)
+        if error is not None:
+            # Its journal record stays, so it is offered again at the next start
+            messagebox.showerror("Error", f"Challan {job['challan_number']} could not be generated:\n{error}\n\nIt will be offered for restoring at the next start.")
+        else:
+            if draft_job is not None:
+                self.draft.finish(draft_job)
+            show_toast(self, f"Challan {job['challan_number']} generated successfully!")
+            # Lets the Statistics page refresh
+            self.event_generate("<<ChallanGenerated>>")
+        if not self.worker.pending:
+            self.compact_draft()
     
     def clear_items(self):
         for row in self.tree.get_children():
             self.tree.delete(row)
         self.items.clear()
+        self.draft.append({"clear": "items"})
 
+    def fill_item(self, details):
+        self.hsn_text.delete("1.0", "end")
+        self.hsn_text.insert("1.0", details["hsn"])
+        self.amount_text.delete("1.0", "end")
+        self.amount_text.insert("1.0", str(details["amount"]))
+        self.pieces_text.focus_set()
+    
     def add_item(self):
-        item_name = self.item_name_text.get("1.0", "end-1c").strip()
+        item_name = self.item_name_text.get().strip()
         hsn = self.hsn_text.get("1.0", "end-1c").strip()
         pieces = self.pieces_text.get("1.0", "end-1c").strip()
         amount = self.amount_text.get("1.0", "end-1c").strip()
@@ -232,14 +559,18 @@ class HomePage(ctk.CTkFrame):
             return
         self.tree.insert("", "end", values=(item_name, hsn, pieces, amount))
         self.items.append((item_name, hsn, int(pieces), int(amount)))
+        self.draft.append({"item": self.items[-1]})
         # self.item_name_text.delete("1.0", "end")
         # self.hsn_text.delete("1.0", "end")
         self.pieces_text.delete("1.0", "end")
         self.amount_text.delete("1.0", "end")
+        self.schedule_draft_save()
     
     def submit_data(self):
-        company_data = load_data_file(COMPANY_DATA_FILE)
-        transport_data = load_data_file(TRANSPORT_DATA_FILE)
+        trace = ChallanTrace("gui")
+        with trace.activate(), span("master data"):
+            company_data = company_store.get()
+            transport_data = transport_store.get()
         company_name = self.company_text.get().strip().upper()
         transport_name = self.transport_text.get().strip().upper()
         date = self.date_text.get("1.0", "end-1c").strip()
@@ -268,14 +599,14 @@ class HomePage(ctk.CTkFrame):
             messagebox.showerror("Error", "Challan Number is required.")
             return
         
-        # Call the generate_challan function
-        generate_challan(
+        # Hand the challan to the background worker; the form is free again right away
+        job = dict(
             company_data=company_data,
             transport_data=transport_data,
             contact_no=contact_no,
             company_name=company_name,
             transport_name=transport_name,
-            items_data=self.items,
+            items_data=list(self.items),
             discount=int(discount),
             gst=int(gst),
             date=date,
@@ -283,11 +614,14 @@ class HomePage(ctk.CTkFrame):
             No_of_Other_Party_Goods=self.no_of_other_goods.get("1.0", "end-1c").strip(),
             Amount_of_Other_Party_Goods=self.amount_of_other_goods.get("1.0", "end-1c").strip()
         )
-        messagebox.showinfo("Success", "Challan generated successfully!")
+        # The journal keeps this challan until challan_done() hears it was written
+        self.job_drafts[id(job)] = self.draft.submit({**self.form_fields(), "challan_number": challan_number}, self.items)
+        self.worker.submit(job, trace)
+        self.update_progress()
         
         # Clear fields after submission
-        self.company_text.set("Select Company")
-        self.transport_text.set("Select transport")
+        self.company_text.set("")
+        self.transport_text.set("")
         self.challan_number_text.delete("1.0", "end")
         self.date_text.delete("1.0", "end")
         self.discount_text.delete("1.0", "end")
@@ -295,6 +629,7 @@ class HomePage(ctk.CTkFrame):
         self.clear_items()
         self.no_of_other_goods.delete("1.0", "end")
         self.amount_of_other_goods.delete("1.0", "end")
+        self.save_draft_fields()
 
 class AddSupplierPage(ctk.CTkFrame):
     def __init__(self, parent):
@@ -314,25 +649,16 @@ class AddSupplierPage(ctk.CTkFrame):
             messagebox.showerror("Error", "Supplier Name is required.")
             return
         company_name = company_name.strip().upper()
-        company_data = load_data_file(COMPANY_DATA_FILE)
-        company_data[company_name] = {
+        company_store.set(company_name, {
             'address1': self.address1_text.get("1.0", "end-1c").strip().upper(),
             'address2': self.address2_text.get("1.0", "end-1c").strip(),
             'gst': self.gst_text.get("1.0", "end-1c").strip(),
-        }
-        save_data_file(COMPANY_DATA_FILE, company_data)
+        })
         messagebox.showinfo("Success", f"Supplier '{company_name}' added/modified successfully!")
         self.address1_text.delete("1.0", "end")
         self.address2_text.delete("1.0", "end")
         self.gst_text.delete("1.0", "end")
-        
-        # Update the supplier dropdown in HomePage
-        # Traverse the widget hierarchy: self -> main_frame -> MainApp
-        home_page = self.master.master.pages.get("home")
-        if home_page:
-            new_supplier_names, _ = load_names()
-            # Update the dropdown values and optionally set a default value
-            home_page.company_text.configure(values=sorted(new_supplier_names))
+        # company_store.set() has already added the name to the picker's index
 
 class AddCustomerPage(ctk.CTkFrame):
     def __init__(self, parent):
@@ -352,25 +678,33 @@ class AddCustomerPage(ctk.CTkFrame):
             messagebox.showerror("Error", "Customer Name is required.")
             return
         customer_name = customer_name.strip().upper()
-        transport_data = load_data_file(TRANSPORT_DATA_FILE)
-        transport_data[customer_name] = {
+        transport_store.set(customer_name, {
             'station': self.station_text.get("1.0", "end-1c").strip().upper(),
             'gst': self.gst_text.get("1.0", "end-1c").strip(),
             'Way': self.way_text.get("1.0", "end-1c").strip().upper(),
-        }
-        save_data_file(TRANSPORT_DATA_FILE, transport_data)
+        })
         messagebox.showinfo("Success", f"Customer '{customer_name}' added/modified successfully!")
         self.gst_text.delete("1.0", "end")
         self.way_text.delete("1.0", "end")
         self.station_text.delete("1.0", "end")
-        
-        # Update the customer dropdown in HomePage
-        home_page = self.master.master.pages.get("home")
-        if home_page:
-            _, new_customer_names = load_names()
-            home_page.transport_text.configure(values=sorted(new_customer_names))
+        # transport_store.set() has already added the name to the picker's index
 
 class StatisticsPage(ctk.CTkFrame):
+    """
+    Charts of the challan ledger. The figure and its bars are made once and
+    only their heights and labels change on a refresh, which redraws through
+    draw_idle(). The ledger is read on a background thread, every
+    REFRESH_INTERVAL ms and whenever the Home page finishes a challan.
+    """
+
+    # Months in the per-month charts, years in the discount/GST chart and bars in the top-10 charts
+    MONTHS = 12
+    YEARS = 5
+    TOP = 10
+
+    # How often the page looks for challans added by other programs, in milliseconds
+    REFRESH_INTERVAL = 5000
+
     def __init__(self, parent):
         super().__init__(parent, fg_color=deep_slate)
         # Title label
@@ -378,61 +712,299 @@ class StatisticsPage(ctk.CTkFrame):
         title.pack(pady=20)
         
         # Add a refresh button so the user can update the graph manually
-        refresh_button = ctk.CTkButton(self, text="Refresh", command=self.update_graph)
+        refresh_button = ctk.CTkButton(self, text="Refresh", command=self.refresh)
         refresh_button.pack(pady=10)
         
-        # Placeholder for the canvas so we can update it later.
-        self.canvas = None
+        self.build_figure()
         
-        # Build the initial graph.
-        self.update_graph()
-
-    def update_graph(self):
-        # If a canvas already exists, destroy it to clear the old graph.
-        if self.canvas is not None:
-            self.canvas.get_tk_widget().destroy()
+        # Summaries computed on the background thread, picked up by poll_refresh()
+        self.results = queue.Queue()
+        self.refreshing = False
+        self.version = None
         
-        # Get the updated monthly counts from the generated files.
-        monthly_counts = get_monthly_challan_counts()  # Your helper function that returns a dict like {"Jan": count, ...}
-        if not monthly_counts:
-            monthly_counts = {}  # Or you could use {"No Data": 0} if you prefer.
+        # Refresh as soon as the Home page has written a challan, and now and then for other programs
+        self.winfo_toplevel().bind("<<ChallanGenerated>>", lambda event: self.refresh(), add="+")
+        self.refresh()
+        self.after(self.REFRESH_INTERVAL, self.auto_refresh)
+
+    def build_figure(self):
+        # Matplotlib is imported here so it doesn't slow down startup
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.figure = Figure(figsize=(12, 8), dpi=100, layout="constrained")
+        self.labels = None
+        axes = self.figure.subplots(2, 3)
+        self.axes = axes
         
-        # Mapping month abbreviations to their numeric values.
-        month_map = {
-            "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4,
-            "May": 5, "Jun": 6, "Jul": 7, "Aug": 8,
-            "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12
-        }
+        ax = axes[0][0]
+        self.month_bars = ax.bar(range(self.MONTHS), [0] * self.MONTHS, color='skyblue')
+        ax.set_title("Challans Generated Per Month")
+        ax.set_ylabel("Number of Challans")
         
-        # Get the current month number.
-        current_month = datetime.now().month
+        ax = axes[0][1]
+        self.net_bars = ax.bar(range(self.MONTHS), [0] * self.MONTHS, color='#A9DFD8', label="Net amount")
+        self.rolling_line, = ax.plot([], [], color='#FCB859', label="3-month average")
+        ax.set_title("Net Amount Per Month")
+        ax.legend(fontsize=8)
         
-        # Define a ranking function to order months cyclically so that the current month is last.
-        def rank_func(m):
-            num = month_map[m]
-            # If the month number is greater than the current month,
-            # subtract 12 to place it before the current month in the cyclic order.
-            return num if num <= current_month else num - 12
+        ax = axes[0][2]
+        self.discount_bars = ax.bar(range(self.YEARS), [0] * self.YEARS, color='#F2C8ED', label="Discount")
+        self.gst_bars = ax.bar(range(self.YEARS), [0] * self.YEARS, color='#FCB859', label="GST")
+        ax.set_title("Discount and GST Per Year")
+        ax.legend(fontsize=8)
         
-        # Sort the keys (month abbreviations) from monthly_counts using the ranking function.
-        ordered_months = sorted(monthly_counts.keys(), key=rank_func)
-        counts = [monthly_counts[m] for m in ordered_months]
+        # Largest total at the top
+        self.top_bars = {}
+        for ax, key, title, color in (
+            (axes[1][0], "suppliers", "Revenue Per Supplier", '#FCB859'),
+            (axes[1][1], "customers", "Top Customers", '#F2C8ED'),
+            (axes[1][2], "hsn_pieces", "Pieces Per HSN Code", 'skyblue'),
+        ):
+            self.top_bars[key] = ax.barh(range(self.TOP - 1, -1, -1), [0] * self.TOP, color=color)
+            ax.set_title(title)
+            ax.tick_params(axis="y", labelsize=8)
         
-        # Create a new Matplotlib figure.
-        fig = Figure(figsize=(6, 4), dpi=100)
-        ax = fig.add_subplot(111)
-        ax.bar(ordered_months, counts, color='skyblue')
-        ax.set_title("Challans Generated Per Month")
-        ax.set_xlabel("Month")
-        ax.set_ylabel("Number of Challans")
-        if counts:
-            ax.set_ylim(0, max(counts) + 5)  # Add some headroom
+        for ax in axes[0]:
+            ax.tick_params(axis="x", labelrotation=45, labelsize=8)
         
         # Embed the figure into the CustomTkinter frame.
-        self.canvas = FigureCanvasTkAgg(fig, master=self)
-        self.canvas.draw()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
         self.canvas.get_tk_widget().pack(fill="both", expand=True)
 
+    def refresh(self):
+        """Read the ledger on a background thread; the charts change once it is done."""
+        if self.refreshing:
+            return
+        self.refreshing = True
+        threading.Thread(target=self.load_summary, daemon=True).start()
+        self.after(100, self.poll_refresh)
+
+    def load_summary(self):
+        try:
+            # Imported here so NumPy doesn't slow down startup
+            from challan_analytics import challan_summary
+            ensure_ledger()
+            self.results.put(challan_summary(months=self.MONTHS, top=self.TOP))
+        except Exception as exc:
+            self.results.put(exc)
+
+    def poll_refresh(self):
+        try:
+            summary = self.results.get_nowait()
+        except queue.Empty:
+            self.after(100, self.poll_refresh)
+            return
+        self.refreshing = False
+        if isinstance(summary, Exception):
+            print(f"Could not read the challan statistics: {summary}")
+        elif summary["version"] != self.version:
+            self.version = summary["version"]
+            self.update_graph(summary)
+
+    def auto_refresh(self):
+        self.refresh()
+        self.after(self.REFRESH_INTERVAL, self.auto_refresh)
+
+    @staticmethod
+    def set_bars(bars, values, bottoms=None):
+        """Set bar heights (widths for horizontal bars); bars without a value are set to 0."""
+        values = list(values)
+        bottoms = list(bottoms) if bottoms is not None else [0] * len(values)
+        padding = [0] * (len(bars) - len(values))
+        for bar, value, bottom in zip(bars, values + padding, bottoms + padding):
+            if bars.orientation == "horizontal":
+                bar.set_width(value)
+            else:
+                bar.set_height(value)
+                bar.set_y(bottom)
+
+    def update_graph(self, summary):
+        # Constrained layout costs more than the rest of a redraw, so it only runs when labels change
+        labels = (tuple(summary["months"]), tuple(summary["years"][-self.YEARS:])) + tuple(tuple(summary[key][0]) for key in self.top_bars)
+        self.figure.set_layout_engine("constrained" if labels != self.labels else "none")
+        self.labels = labels
+        
+        months = summary["months"]
+        ax = self.axes[0][0]
+        self.set_bars(self.month_bars, summary["month_counts"])
+        ax.set_xticks(range(len(months)), months)
+        ax.set_ylim(0, max(summary["month_counts"], default=0) + 5)  # Add some headroom
+        
+        ax = self.axes[0][1]
+        self.set_bars(self.net_bars, summary["month_net"])
+        self.rolling_line.set_data(range(len(months)), summary["month_net_rolling"])
+        ax.set_xticks(range(len(months)), months)
+        ax.set_ylim(0, max(max(summary["month_net"], default=0) * 1.1, 1))
+        
+        ax = self.axes[0][2]
+        years = summary["years"][-self.YEARS:]
+        discount = summary["year_discount"][-self.YEARS:]
+        gst = summary["year_gst"][-self.YEARS:]
+        self.set_bars(self.discount_bars, discount)
+        self.set_bars(self.gst_bars, gst, bottoms=discount)
+        ax.set_xticks(range(len(years)), [str(year) for year in years])
+        ax.set_ylim(0, max(max(discount + gst, default=0) * 1.1, 1))
+        
+        for ax, key in zip(self.axes[1], ("suppliers", "customers", "hsn_pieces")):
+            names, totals = summary[key]
+            self.set_bars(self.top_bars[key], totals)
+            ax.set_yticks(range(self.TOP - 1, self.TOP - 1 - len(names), -1), names)
+            ax.set_xlim(0, max(max(totals, default=0) * 1.1, 1))
+        
+        self.canvas.draw_idle()
+
+class SearchPage(ctk.CTkFrame):
+    """
+    Find issued challans by supplier, customer, item, HSN code, challan number
+    or date. Searches run on a background thread, which also adds challans
+    recorded since the last search to the index; the first one builds it.
+    """
+
+    # Most challans listed for one search
+    RESULTS = 200
+
+    def __init__(self, parent):
+        super().__init__(parent, fg_color=deep_slate)
+        title = ctk.CTkLabel(self, text="🔍 Search Challans", font=("Arial", 24))
+        title.pack(pady=20)
+        
+        self.query_entry = ctk.CTkEntry(self, width=700, font=("Arial", 16), placeholder_text='e.g. customer:"XYZ FAB" hsn:5407 from:01.07.25 to:30.09.25')
+        self.query_entry.pack(pady=10)
+        self.query_entry.bind("<KeyRelease>", self.schedule_search)
+        
+        help_text = ("Words match supplier, customer and item names, HSN codes and challan numbers. "
+                     "Narrow down with supplier:, customer:, item:, hsn:, no:, date:, from: and to: (dates as DD.MM.YY). "
+                     "Double-click a challan to open it.")
+        help_label = ctk.CTkLabel(self, text=help_text, font=("Arial", 12), wraplength=900, justify="left")
+        help_label.pack(pady=5)
+        
+        self.status_label = ctk.CTkLabel(self, text="Building the search index...", font=("Arial", 14))
+        self.status_label.pack(pady=5)
+        
+        columns = (("Counter", 80), ("Challan", 100), ("Date", 100), ("Supplier", 300), ("Customer", 300), ("Pieces", 80), ("Net", 120))
+        self.tree = ttk.Treeview(self, columns=[name for name, _ in columns], show="headings")
+        for name, width in columns:
+            self.tree.heading(name, text=name)
+            self.tree.column(name, width=width)
+        self.tree.pack(fill="both", expand=True, padx=20, pady=10)
+        self.tree.bind("<Double-1>", self.open_selected)
+        self.rows = {}
+        
+        # Results computed on the background thread, picked up by poll_search()
+        self.results = queue.Queue()
+        self.searching = False
+        self.search_again = False
+        self.search_after = None
+        self.run_search()
+
+    def schedule_search(self, event=None):
+        # Wait for a pause in typing
+        if self.search_after is not None:
+            self.after_cancel(self.search_after)
+        self.search_after = self.after(250, self.run_search)
+
+    def run_search(self):
+        self.search_after = None
+        if self.searching:
+            self.search_again = True
+            return
+        self.searching = True
+        query = self.query_entry.get().strip()
+        threading.Thread(target=self.search, args=(query,), daemon=True).start()
+        self.after(50, self.poll_search)
+
+    def search(self, query):
+        try:
+            start = time.perf_counter()
+            ensure_ledger()
+            index = load_search_index()
+            ids = index.search(query, self.RESULTS) if query else []
+            self.results.put((query, index.count, challan_rows(ids), time.perf_counter() - start))
+        except Exception as exc:
+            self.results.put(exc)
+
+    def poll_search(self):
+        try:
+            result = self.results.get_nowait()
+        except queue.Empty:
+            self.after(50, self.poll_search)
+            return
+        self.searching = False
+        if isinstance(result, Exception):
+            self.status_label.configure(text=f"Search failed: {result}")
+        else:
+            self.show_results(*result)
+        if self.search_again:
+            self.search_again = False
+            self.run_search()
+
+    def show_results(self, query, indexed, rows, elapsed):
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        self.rows.clear()
+        for row in rows:
+            item = self.tree.insert("", "end", values=(
+                row["counter"], row["challan_number"], row["date"], row["company_name"],
+                row["transport_name"], row["total_pieces"], row["net_amount"],
+            ))
+            self.rows[item] = row
+        if not query:
+            self.status_label.configure(text=f"{indexed} challans indexed")
+        else:
+            more = "+" if len(rows) >= self.RESULTS else ""
+            self.status_label.configure(text=f"{len(rows)}{more} of {indexed} challans match ({elapsed * 1000:.0f} ms)")
+
+    def open_selected(self, event=None):
+        row = self.rows.get(self.tree.focus())
+        if row is None:
+            return
+        try:
+            path = row["file"]
+            if is_archive_reference(path):
+                # Archived challans are written out to a temporary workbook first
+                path = reprint_challan(row["counter"])
+            open_file(path)
+        except Exception as exc:
+            messagebox.showerror("Error", f"Challan {row['challan_number']} could not be opened:\n{exc}")
+
+class DiagnosticsPage(ctk.CTkFrame):
+    """p50/p95 time of every challan generation stage, from the timing log."""
+
+    # Number of most recent challans the figures are taken from
+    RECENT_CHALLANS = 500
+
+    def __init__(self, parent):
+        super().__init__(parent, fg_color=deep_slate)
+        title = ctk.CTkLabel(self, text="⏱ Diagnostics", font=("Arial", 24))
+        title.pack(pady=20)
+        
+        refresh_button = ctk.CTkButton(self, text="Refresh", command=self.update_table)
+        refresh_button.pack(pady=10)
+        
+        self.summary_label = ctk.CTkLabel(self, text="", font=("Arial", 14), justify="left")
+        self.summary_label.pack(pady=10)
+        
+        self.tree = ttk.Treeview(self, columns=("Stage", "Count", "p50", "p95", "Max"), show="headings")
+        for column, text in (("Stage", "Stage"), ("Count", "Challans"), ("p50", "p50 (ms)"), ("p95", "p95 (ms)"), ("Max", "Max (ms)")):
+            self.tree.heading(column, text=text)
+        self.tree.pack(fill="both", expand=True, padx=20, pady=10)
+        
+        self.update_table()
+
+    def update_table(self):
+        for row in self.tree.get_children():
+            self.tree.delete(row)
+        entries = read_timing_log(self.RECENT_CHALLANS)
+        for stage, count, p50, p95, worst in stage_percentiles(entries):
+            self.tree.insert("", "end", values=(stage, count, f"{p50:.1f}", f"{p95:.1f}", f"{worst:.1f}"))
+        
+        summary = f"Last {len(entries)} challans from {TIMING_LOG_FILE}"
+        if PROFILE_DIRECTORY:
+            summary += f"\ncProfile captures are saved in {PROFILE_DIRECTORY}"
+        else:
+            summary += "\nSet CHALLAN_PROFILE=1 to save a cProfile capture of every challan"
+        self.summary_label.configure(text=summary)
+
 class AboutPage(ctk.CTkFrame):
     def __init__(self, parent):
         super().__init__(parent, fg_color=deep_slate)
@@ -468,6 +1040,11 @@ class AboutPage(ctk.CTkFrame):
 
 def main():
     app = MainApp()
+    if STARTUP_TIMING:
+        def window_ready():
+            mark_startup("window ready")
+            print_startup_report()
+        app.after_idle(window_ready)
     app.mainloop()
 
 if __name__ == '__main__':